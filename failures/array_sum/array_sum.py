@@ -3,7 +3,14 @@ The problem:
 
 Given an array of numbers and a sum value. Find the first two numbers in the array
 that add to the sum value. ([3, 5, 9, 6, 12, 15]; 18)
+
+KSumIndex answers the same question for many sums, and for k numbers rather
+than two, against one array that is indexed up front.
 """
+from itertools import accumulate, compress, count, repeat
+from functools import partial
+from operator import lt, sub
+
 
 def array_sum(array, sum):
     # Interviewer gave me this clue during interview. Didn't figure out how to use it until
@@ -14,7 +21,8 @@ def array_sum(array, sum):
         complement = sum - num
         comp_index = complement_cache.get(complement)
 
-        if comp_index:
+        # Index 0 is a valid match, so test for None rather than truthiness.
+        if comp_index is not None:
             return [array[comp_index], array[i]]
         else:
             # Initially screwed this up by using complement rather than num as key.
@@ -22,9 +30,112 @@ def array_sum(array, sum):
 
     return None
 
-array = [3, 5, 9, 6, 12, 15]
-sum = 18
 
-array_pair = array_sum(array, sum)
-print(array_pair)
-assert array_pair == [6, 12]
+class KSumIndex:
+    """Answers "first k numbers that add to sum" queries against one array.
+
+    "First" means what array_sum means for pairs: the combination that is
+    complete earliest, i.e. whose last index is smallest. Let done(s, k) be
+    that last index. Then done(s, 1) is the first index of s, and
+
+        done(s, k) = the first j where done(s - array[j], k - 1) < j
+
+    So a k-sum query is one pass over the array, looking up (k-1)-sum answers
+    for each remaining sum. For pairs the lookup is the value -> first index
+    hash built here, and the pass runs inside map/compress with no Python-level
+    loop. It stops at the first match, like array_sum, but builds no dict per
+    query. The sorted copy gives the smallest and largest k-sums, so sums
+    outside that range are answered without a pass. Answers are cached, so
+    repeated and nested sums are only worked out once.
+    """
+    CACHE_SIZE = 1 << 20
+
+    def __init__(self, array):
+        self.array = list(array)
+        self.sorted = sorted(self.array)
+        # Smallest and largest sums of k numbers, at [k - 1].
+        self.lowest = list(accumulate(self.sorted))
+        self.highest = list(accumulate(reversed(self.sorted)))
+        self.first_index = {}
+        for i, num in enumerate(self.array):
+            self.first_index.setdefault(num, i)
+        self.cache = {}
+
+    #
+    # Public Methods
+    #
+    def first_sum(self, target, k=2):
+        """Returns the first k numbers (in array order) that add to target, or None."""
+        if k < 1:
+            raise ValueError('k must be at least 1: {}'.format(k))
+
+        end = self.done(target, k)
+        if end is None:
+            return None
+        if k == 1:
+            return [target]
+        return self.first_sum(target - self.array[end], k - 1) + [self.array[end]]
+
+    def first_sums(self, targets, k=2):
+        return [self.first_sum(target, k) for target in targets]
+
+    #
+    # Private Methods
+    #
+    def done(self, target, k):
+        """Index at which the first k numbers adding to target are complete, or None."""
+        if k == 1:
+            return self.first_index.get(target)
+
+        key = (target, k)
+        if key in self.cache:
+            return self.cache[key]
+
+        if not self.in_range(target, k):
+            end = None
+        else:
+            # Not target.__sub__: int.__sub__(float) is NotImplemented, not a number.
+            remainders = map(partial(sub, target), self.array)
+            if k == 2:
+                found_at = map(self.first_index.get, remainders, repeat(len(self.array)))
+            else:
+                found_at = map(self.done_or_never, remainders, repeat(k - 1))
+            end = next(compress(count(), map(lt, found_at, count())), None)
+
+        if len(self.cache) >= self.CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = end
+        return end
+
+    def done_or_never(self, target, k):
+        end = self.done(target, k)
+        return len(self.array) if end is None else end
+
+    def in_range(self, target, k):
+        if k > len(self.sorted):
+            return False
+        return self.lowest[k - 1] <= target <= self.highest[k - 1]
+
+
+if __name__ == '__main__':
+    array = [3, 5, 9, 6, 12, 15]
+    sum = 18
+
+    array_pair = array_sum(array, sum)
+    print(array_pair)
+    assert array_pair == [6, 12]
+
+    # The first number can be the complement.
+    assert array_sum([3, 5, 15], 18) == [3, 15]
+
+    index = KSumIndex(array)
+    assert index.first_sums([18, 8, 2, 27], k=2) == [[6, 12], [3, 5], None, [12, 15]]
+    assert index.first_sum(17, k=3) == [3, 5, 9]
+    assert index.first_sum(6, k=1) == [6]
+
+    # Mixed numeric types: int targets against float and Fraction elements.
+    from fractions import Fraction
+    assert KSumIndex([2.5, 3, 15.5]).first_sum(18) == array_sum([2.5, 3, 15.5], 18) == [2.5, 15.5]
+    assert KSumIndex([Fraction(1, 2), 4, Fraction(3, 2)]).first_sum(2) == [Fraction(1, 2),
+                                                                          Fraction(3, 2)]
+    assert KSumIndex([1.5, 2, 0.5, 7]).first_sum(4, k=3) == [1.5, 2, 0.5]
@@ -0,0 +1,84 @@
+"""
+Benchmark of KSumIndex against one array_sum dict scan per query.
+
+Draws a random array and a batch of target sums, some reachable and some not,
+answers them both ways, checks the answers match, and reports queries per
+second.
+
+Usage:
+python benchmark.py
+python benchmark.py --size 100000 --queries 2000 --k 3
+"""
+import argparse
+import random
+import time
+from array_sum import array_sum, KSumIndex
+
+
+def workload(size, queries, seed=0):
+    rng = random.Random(seed)
+    array = [rng.randint(-size, size) for _ in range(size)]
+    # Half the targets are sums of two drawn numbers, the rest may not be reachable.
+    targets = [rng.choice(array) + rng.choice(array) if n % 2 else rng.randint(-3 * size, 3 * size)
+               for n in range(queries)]
+    return array, targets
+
+
+def per_query_k_sum(array, target, k):
+    # Baseline for k > 2: array_sum over each prefix, as a dict scan would.
+    if k == 2:
+        return array_sum(array, target)
+    for j in range(k - 1, len(array)):
+        found = per_query_k_sum(array[:j], target - array[j], k - 1)
+        if found:
+            return found + [array[j]]
+    return None
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def run(size, queries, k=2, seed=0):
+    array, targets = workload(size, queries, seed)
+
+    expected, scan_time = timed(lambda: [per_query_k_sum(array, t, k) for t in targets])
+    index, build_time = timed(lambda: KSumIndex(array))
+    answers, index_time = timed(lambda: index.first_sums(targets, k))
+    # Run the batch again to show what repeated targets cost once cached.
+    _, cached_time = timed(lambda: index.first_sums(targets, k))
+
+    if k == 2:
+        assert answers == expected, 'KSumIndex disagrees with array_sum'
+    else:
+        assert [a is None for a in answers] == [e is None for e in expected]
+
+    return {
+        'size': size,
+        'queries': queries,
+        'k': k,
+        'found': sum(a is not None for a in answers),
+        'scan qps': queries / scan_time,
+        'index build s': build_time,
+        'index qps': queries / index_time,
+        'cached qps': queries / cached_time,
+        'speedup': scan_time / (build_time + index_time),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark KSumIndex against array_sum.')
+    parser.add_argument('--size', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=2)
+    args = parser.parse_args()
+
+    for size in args.size:
+        result = run(size, args.queries, args.k)
+        print(', '.join('{}: {}'.format(key, round(value, 3)) for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,32 +2,44 @@
 The problem:
 
 runlength_encode("aabbbcaa") should return "2a3b1c2a"
+
+For bytes, long runs or input bigger than memory, see rle.py.
 """
+import re
+
+
 def runlength_encode(chars):
-    chunks = []
-    new_chunk = [chars[0]]
+    if not chars:
+        return ""
 
-    for next_c in chars[1:]:
-        last_c = new_chunk[-1]
-        if next_c == last_c:
-            new_chunk.append(next_c)
+    # Count runs rather than collecting them, and join the fragments once at the end:
+    # growing a string with += copies it on every run.
+    fragments = []
+    run_char = chars[0]
+    run_length = 0
+
+    for next_c in chars:
+        if next_c == run_char:
+            run_length += 1
         else:
-            chunks.append(new_chunk)
-            new_chunk = [next_c]
+            fragments.append("{}{}".format(run_length, run_char))
+            run_char = next_c
+            run_length = 1
 
     # Don't forget your last chunk
-    chunks.append(new_chunk)
+    fragments.append("{}{}".format(run_length, run_char))
+
+    return "".join(fragments)
 
-    encoded_str = ""
-    for chunk in chunks:
-        chunk_char = chunk[0]
-        encoded_frag = "{}{}".format(len(chunk), chunk_char)
-        encoded_str += encoded_frag
 
-    return encoded_str
+def runlength_decode(encoded):
+    # Characters are assumed not to be digits; "11" can't be told from eleven of something.
+    return "".join(char * int(length) for length, char in re.findall(r"(\d+)(\D)", encoded))
 
 
 if __name__ == '__main__':
     encoded = runlength_encode("aabbbcaa")
     print(encoded)
     assert encoded == "2a3b1c2a"
+    assert runlength_decode(encoded) == "aabbbcaa"
+    assert runlength_encode("") == ""
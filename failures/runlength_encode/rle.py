@@ -0,0 +1,223 @@
+"""
+Run-length codec for bytes.
+
+A binary take on challenge.py's "2a3b1c2a" for data where the text format
+falls short: any byte value can repeat (digits included), runs can be
+billions long, and inputs can be bigger than memory. The encoded form is a
+sequence of records, each a run length as a LEB128 varint followed by the
+byte repeated:
+
+    b'\\x00' * 1000 + b'ab'  ->  e8 07 00  01 61  01 62
+
+Run boundaries in a buffer are found without a Python-level loop over bytes:
+XOR-ing the buffer with itself shifted by one (as big integers) leaves a
+non-zero byte wherever the value changes. A regex search or itertools.compress
+then picks out those positions, whichever suits how many runs there are. When
+every run in a chunk is shorter than 128, records are built and expanded with
+zip/map rather than one at a time.
+
+RunLengthEncoder and RunLengthDecoder work a chunk at a time, carrying the
+open run or the partial record across chunk boundaries. Long runs are
+decoded in pieces, so memory stays bounded on multi-GB sparse bitmaps.
+
+Usage:
+python rle.py encode bitmap.bin bitmap.rle
+python rle.py decode bitmap.rle bitmap.bin
+"""
+import re
+import sys
+from itertools import chain, compress, count
+from operator import mul, sub
+
+
+CHUNK_SIZE = 1 << 22
+PIECE_SIZE = 1 << 22
+NON_ZERO = bytes([0] + [1] * 255)
+CHANGE = re.compile(b'\x01')
+BYTES = [bytes([n]) for n in range(256)]
+SMALL_RUN = 0x80
+
+
+#
+# Runs
+#
+def find_runs(data):
+    """Returns (lengths, values) for the runs in data."""
+    size = len(data)
+    if size == 0:
+        return [], b''
+
+    changes = (int.from_bytes(data[1:], 'big') ^ int.from_bytes(data[:-1], 'big'))
+    changes = changes.to_bytes(size - 1, 'big').translate(NON_ZERO)
+
+    # Run starts: regex search skips long runs quickly; compress wins once
+    # runs are short and there are many matches to box.
+    starts = [0]
+    if changes.count(1) < size // 8:
+        starts.extend(match.end() for match in CHANGE.finditer(changes))
+    else:
+        starts.extend(compress(count(1), changes))
+
+    lengths = list(map(sub, starts[1:] + [size], starts))
+    values = bytes(map(data.__getitem__, starts))
+    return lengths, values
+
+
+def varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def encode_runs(lengths, values):
+    if max(lengths, default=0) < SMALL_RUN:
+        return bytes(chain.from_iterable(zip(lengths, values)))
+    return b''.join(chain.from_iterable(zip(map(varint, lengths), map(BYTES.__getitem__, values))))
+
+
+#
+# Encoder
+#
+class RunLengthEncoder:
+    def __init__(self):
+        # The last run seen may continue into the next chunk, so it is held back.
+        self.value = None
+        self.length = 0
+
+    def encode(self, chunk):
+        lengths, values = find_runs(bytes(chunk))
+        if not lengths:
+            return b''
+
+        if values[0] == self.value:
+            lengths[0] += self.length
+        elif self.length:
+            lengths.insert(0, self.length)
+            values = BYTES[self.value] + values
+
+        self.value, self.length = values[-1], lengths.pop()
+        return encode_runs(lengths, values[:-1])
+
+    def flush(self):
+        if not self.length:
+            return b''
+        encoded = varint(self.length) + BYTES[self.value]
+        self.value, self.length = None, 0
+        return encoded
+
+
+#
+# Decoder
+#
+class RunLengthDecoder:
+    def __init__(self):
+        # Bytes of a record cut off at the end of the last chunk.
+        self.pending = b''
+
+    def decode(self, chunk):
+        """Yields decoded pieces of at most PIECE_SIZE bytes (or one piece of
+        short runs).
+        """
+        data = self.pending + bytes(chunk)
+        usable = len(data) - len(data) % 2
+        lengths = data[0:usable:2]
+
+        # All runs short: every record is two bytes, so expand them together.
+        if max(lengths, default=0) < SMALL_RUN:
+            if 0 in lengths:
+                raise ValueError('Invalid run-length data: zero-length run')
+            self.pending = data[usable:]
+            if lengths:
+                yield b''.join(map(mul, map(BYTES.__getitem__, data[1:usable:2]), lengths))
+            return
+
+        pos = 0
+        while True:
+            record = self.read_record(data, pos)
+            if record is None:
+                break
+            length, value, pos = record
+            yield from self.expand(value, length)
+        self.pending = data[pos:]
+
+    def close(self):
+        if self.pending:
+            raise ValueError('Truncated run-length data: {} bytes left over'.format(
+                len(self.pending)))
+
+    @staticmethod
+    def read_record(data, pos):
+        """Returns (length, value, next pos), or None if the record at pos is
+        incomplete.
+        """
+        length = shift = 0
+        while pos < len(data):
+            byte = data[pos]
+            pos += 1
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                if pos == len(data):
+                    return None
+                if length == 0:
+                    raise ValueError('Invalid run-length data: zero-length run')
+                return length, data[pos], pos + 1
+        return None
+
+    @staticmethod
+    def expand(value, length):
+        piece = BYTES[value] * min(length, PIECE_SIZE)
+        while length > PIECE_SIZE:
+            yield piece
+            length -= PIECE_SIZE
+        yield piece[:length]
+
+
+#
+# Public Functions
+#
+def encode(data):
+    encoder = RunLengthEncoder()
+    return encoder.encode(data) + encoder.flush()
+
+
+def decode(encoded):
+    decoder = RunLengthDecoder()
+    decoded = b''.join(decoder.decode(encoded))
+    decoder.close()
+    return decoded
+
+
+def encode_stream(src, dst, chunk_size=CHUNK_SIZE):
+    """Encodes binary file object src into dst. Returns bytes written."""
+    encoder = RunLengthEncoder()
+    written = 0
+    for chunk in iter(lambda: src.read(chunk_size), b''):
+        written += dst.write(encoder.encode(chunk))
+    return written + dst.write(encoder.flush())
+
+
+def decode_stream(src, dst, chunk_size=CHUNK_SIZE):
+    """Decodes binary file object src into dst. Returns bytes written."""
+    decoder = RunLengthDecoder()
+    written = 0
+    for chunk in iter(lambda: src.read(chunk_size), b''):
+        for piece in decoder.decode(chunk):
+            written += dst.write(piece)
+    decoder.close()
+    return written
+
+
+#
+# Main
+#
+if __name__ == '__main__':
+    command, src_path, dst_path = sys.argv[1:4]
+    stream = {'encode': encode_stream, 'decode': decode_stream}[command]
+
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        written = stream(src, dst)
+    print('{}d {} -> {} ({} bytes)'.format(command, src_path, dst_path, written))
@@ -1,5 +1,6 @@
 import unittest
-from sudoku_solver import GameBoard, Game
+from sudoku_solver import GameBoard, Game, DepthFirstSolver
+from sudoku_batch import parse_line, solve_boards, format_solution, regressions, slowdowns
 
 
 class TestUM(unittest.TestCase):
@@ -151,5 +152,99 @@ class TestUM(unittest.TestCase):
     self.assertEqual(Game.solve(board), solved_board)
 
 
+  def test_solve_hard_case(self):
+    board = GameBoard(8, 0, 0, 0, 0, 0, 0, 0, 0,
+                      0, 0, 3, 6, 0, 0, 0, 0, 0,
+                      0, 7, 0, 0, 9, 0, 2, 0, 0,
+                      0, 5, 0, 0, 0, 7, 0, 0, 0,
+                      0, 0, 0, 0, 4, 5, 7, 0, 0,
+                      0, 0, 0, 1, 0, 0, 0, 3, 0,
+                      0, 0, 1, 0, 0, 0, 0, 6, 8,
+                      0, 0, 8, 5, 0, 0, 0, 1, 0,
+                      0, 9, 0, 0, 0, 0, 4, 0, 0)
+    solved_board = GameBoard(8, 1, 2, 7, 5, 3, 6, 4, 9,
+                             9, 4, 3, 6, 8, 2, 1, 7, 5,
+                             6, 7, 5, 4, 9, 1, 2, 8, 3,
+                             1, 5, 4, 2, 3, 7, 8, 9, 6,
+                             3, 6, 9, 8, 4, 5, 7, 2, 1,
+                             2, 8, 7, 1, 6, 9, 5, 3, 4,
+                             5, 2, 1, 9, 7, 4, 3, 6, 8,
+                             4, 3, 8, 5, 2, 6, 9, 1, 7,
+                             7, 9, 6, 3, 1, 8, 4, 5, 2)
+    self.assertEqual(Game.solve(board), solved_board)
+
+
+  def test_solve_unsolvable_case(self):
+    # Row 1 leaves only 9 for its last cell, which column 9 already has.
+    board = GameBoard(1, 2, 3, 4, 5, 6, 7, 8, 0,
+                      0, 0, 0, 0, 0, 0, 0, 0, 9,
+                      *[0] * 63)
+    self.assertIsNone(Game.solve(board))
+
+    # Conflicting givens
+    board = GameBoard(5, 5, *[0] * 79)
+    self.assertIsNone(Game.solve(board))
+
+
+  def test_solve_matches_breadth_first_solve(self):
+    board = GameBoard(0, 0, 8, 3, 4, 2, 9, 0, 0,
+                      0, 0, 9, 0, 0, 0, 7, 0, 0,
+                      4, 0, 0, 0, 0, 0, 0, 0, 3,
+                      0, 0, 6, 4, 7, 3, 2, 0, 0,
+                      0, 3, 0, 0, 0, 0, 0, 1, 0,
+                      0, 0, 2, 8, 5, 1, 6, 0, 0,
+                      7, 0, 0, 0, 0, 0, 0, 0, 8,
+                      0, 0, 4, 0, 0, 0, 1, 0, 0,
+                      0, 0, 3, 6, 9, 7, 5, 0, 0)
+    solved_board = Game.solve(board)
+    self.assertIsNotNone(solved_board)
+    self.assertEqual(solved_board, Game.breadth_first_solve(board))
+
+
+  def test_solver_counts_nodes(self):
+    solver = DepthFirstSolver()
+    solution = solver.solve([0] * 81)
+    self.assertNotIn(0, solution)
+    self.assertGreater(solver.nodes, 0)
+
+
+  def test_solve_boards_in_order(self):
+    lines = ['# comment', '',
+             '..4...5...7.2..36.8....1...629....3.....6.....4....618...7....6.13..4.2...2...4.. b',
+             '550000000000000000000000000000000000000000000000000000000000000000000000000000000']
+    boards = [board for board in map(parse_line, lines) if board]
+    self.assertEqual(boards[0][1], 'b')
+
+    results = list(solve_boards(boards, workers=1))
+    self.assertEqual(format_solution(results[0][0])[:9], '234976581')
+    self.assertEqual(format_solution(results[1][0]), 'unsolvable')
+    self.assertRaises(ValueError, parse_line, '123')
+
+
+  def test_regressions_match_boards_by_label(self):
+    baseline = [{'board': 0, 'label': 'a', 'solved': True, 'nodes': 5, 'ms': 1.0},
+                {'board': 1, 'label': 'b', 'solved': True, 'nodes': 9, 'ms': 2.0},
+                {'board': 2, 'label': 'c', 'solved': True, 'nodes': 1, 'ms': 1.0}]
+    results = [{'board': 0, 'label': 'b', 'solved': True, 'nodes': 9, 'ms': 2.0},
+               {'board': 1, 'label': 'a', 'solved': True, 'nodes': 7, 'ms': 1.0},
+               {'board': 2, 'label': 'd', 'solved': True, 'nodes': 1, 'ms': 1.0}]
+
+    reasons = {r['label']: reason for r, reason in regressions(results, baseline)}
+    self.assertEqual(reasons, {'a': 'nodes up from 5', 'd': 'not in baseline',
+                               'c': 'missing from corpus'})
+
+
+  def test_slowdowns_are_relative_to_whole_run(self):
+    baseline = [{'board': n, 'label': str(n), 'solved': True, 'nodes': 1, 'ms': 10.0}
+                for n in range(4)]
+    # A machine three times slower across the board is not a slowdown.
+    slower_machine = [dict(b, ms=30.0) for b in baseline]
+    self.assertEqual(slowdowns(slower_machine, baseline), [])
+    self.assertEqual(regressions(slower_machine, baseline), [])
+
+    one_slow_board = [dict(b, ms=100.0 if b['board'] == 0 else 10.0) for b in baseline]
+    self.assertEqual([r['label'] for r, _ in slowdowns(one_slow_board, baseline)], ['0'])
+
+
 if __name__ == '__main__':
   unittest.main()
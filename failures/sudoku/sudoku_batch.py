@@ -0,0 +1,232 @@
+"""
+Batch Sudoku solving.
+
+Reads boards from a file, one per line as 81 characters (digits, with 0 or .
+for empty cells). Anything after the 81 characters is kept as a label, and
+blank lines and lines starting with # are skipped. Boards are solved in chunks
+across a process pool and solutions are streamed out in input order, one per
+line, as 81 digits or "unsolvable".
+
+The benchmark mode solves a corpus in this process, one board at a time, and
+records each board's time and search node count. Node counts do not depend on
+the machine, so a saved baseline catches solver regressions: any board whose
+node count grows or that no longer solves the same way is flagged, as is any
+board missing from or added to the corpus. Times are only advisory: each
+board's time is compared against the baseline scaled by how much faster or
+slower the whole run was, and boards that stand out are reported without
+failing the run.
+
+Usage:
+python sudoku_batch.py boards.txt > solutions.txt
+python sudoku_batch.py boards.txt --workers 8 --stats > solutions.tsv
+python sudoku_batch.py --benchmark corpus.txt --baseline benchmark.json
+python sudoku_batch.py --benchmark corpus.txt --save benchmark.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sudoku_solver import DepthFirstSolver, SUDOKU_BOARD_CELLS
+
+
+CHUNK_SIZE = 200
+SLOWDOWN = 2.0
+MIN_MS = 5.0
+
+
+#
+# Parsing
+#
+def parse_line(line):
+    """Returns (cell values, label) for a board line, or None to skip it."""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    cells, label = line[:SUDOKU_BOARD_CELLS], line[SUDOKU_BOARD_CELLS:].strip()
+    if len(cells) < SUDOKU_BOARD_CELLS or not all(c.isdigit() or c == '.' for c in cells):
+        raise ValueError('Invalid board line: {}'.format(line))
+
+    return [0 if c == '.' else int(c) for c in cells], label
+
+
+def read_boards(path):
+    with open(path) as f:
+        for line in f:
+            board = parse_line(line)
+            if board:
+                yield board
+
+
+#
+# Solving
+#
+def solve_board(cell_values):
+    """Returns (solution or None, nodes, seconds)."""
+    solver = DepthFirstSolver()
+    started = time.perf_counter()
+    solution = solver.solve(cell_values)
+    return solution, solver.nodes, time.perf_counter() - started
+
+
+def solve_chunk(boards):
+    return [solve_board(cell_values) for cell_values in boards]
+
+
+def chunks(boards, size=CHUNK_SIZE):
+    chunk = []
+    for cell_values, _ in boards:
+        chunk.append(cell_values)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_boards(boards, workers=None, chunk_size=CHUNK_SIZE):
+    """Yields (solution or None, nodes, seconds) for each board, in order.
+    At most two chunks per worker are in flight, so memory stays flat however
+    long the input is.
+    """
+    workers = workers or os.cpu_count()
+    pending = chunks(boards, chunk_size)
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = next(pending, None)
+                if chunk is None:
+                    break
+                in_flight.append(executor.submit(solve_chunk, chunk))
+            if not in_flight:
+                break
+
+            for result in in_flight.popleft().result():
+                yield result
+
+
+def format_solution(solution):
+    return ''.join(map(str, solution)) if solution else 'unsolvable'
+
+
+#
+# Benchmark
+#
+def benchmark(path):
+    results = []
+    for n, (cell_values, label) in enumerate(read_boards(path)):
+        solution, nodes, seconds = solve_board(cell_values)
+        results.append({
+            'board': n,
+            'label': label,
+            'solved': solution is not None,
+            'nodes': nodes,
+            'ms': seconds * 1000,
+        })
+    return results
+
+
+def regressions(results, baseline):
+    """Compares results to a baseline from an earlier run of the same corpus.
+    Returns a list of (result, reason).
+    """
+    current, before = by_board(results), by_board(baseline)
+    flagged = []
+    for key, result in current.items():
+        base = before.get(key)
+        if base is None:
+            flagged.append((result, 'not in baseline'))
+        elif result['solved'] != base['solved']:
+            flagged.append((result, 'solved changed from {}'.format(base['solved'])))
+        elif result['nodes'] > base['nodes']:
+            flagged.append((result, 'nodes up from {}'.format(base['nodes'])))
+    for key, base in before.items():
+        if key not in current:
+            flagged.append((base, 'missing from corpus'))
+    return flagged
+
+
+def slowdowns(results, baseline):
+    """Boards that slowed down more than the run as a whole, which calibrates
+    for the machine. Returns a list of (result, reason); advisory only.
+    """
+    current, before = by_board(results), by_board(baseline)
+    shared = [key for key in current if key in before]
+    total_ms = sum(current[key]['ms'] for key in shared)
+    base_ms = sum(before[key]['ms'] for key in shared)
+    speed = total_ms / base_ms if base_ms else 1.0
+
+    flagged = []
+    for key in shared:
+        result, expected_ms = current[key], before[key]['ms'] * speed
+        if result['ms'] > max(MIN_MS, expected_ms * SLOWDOWN):
+            flagged.append((result, '{:.1f}ms, expected about {:.1f}ms'.format(
+                result['ms'], expected_ms)))
+    return flagged
+
+
+def by_board(results):
+    # Boards are matched by label, or by position when unlabelled.
+    return {r['label'] or '#{}'.format(r['board']): r for r in results}
+
+
+def print_benchmark(results):
+    for r in results:
+        print('{board:>4} {label:<28} {nodes:>7} nodes {ms:>9.2f}ms {status}'.format(
+            status='solved' if r['solved'] else 'unsolvable', **r))
+    print('{} boards, {} nodes, {:.1f}ms'.format(
+        len(results), sum(r['nodes'] for r in results), sum(r['ms'] for r in results)))
+
+
+#
+# Main
+#
+def main():
+    parser = argparse.ArgumentParser(description='Solve Sudoku boards in bulk.')
+    parser.add_argument('path', nargs='?', help='file of boards, one per line')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--stats', action='store_true',
+                        help='append node count and milliseconds to each solution line')
+    parser.add_argument('--benchmark', metavar='CORPUS', help='benchmark the solver on a corpus')
+    parser.add_argument('--baseline', help='benchmark results to compare against')
+    parser.add_argument('--save', help='write benchmark results to this file')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark(args.benchmark)
+        print_benchmark(results)
+
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            flagged = regressions(results, baseline)
+            for result, reason in flagged:
+                print('REGRESSION board {board} {label}: {reason}'.format(reason=reason, **result))
+            for result, reason in slowdowns(results, baseline):
+                print('slower (advisory) board {board} {label}: {reason}'.format(
+                    reason=reason, **result))
+            return 1 if flagged else 0
+        return 0
+
+    if not args.path:
+        parser.error('a boards file or --benchmark is required')
+
+    for solution, nodes, seconds in solve_boards(read_boards(args.path), args.workers):
+        line = format_solution(solution)
+        if args.stats:
+            line = '{}\t{}\t{:.3f}'.format(line, nodes, seconds * 1000)
+        sys.stdout.write(line + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,14 +2,29 @@
 Sudoku solver. (I've never done sudoku before.)
 
 Interface dictated by sudoku.py.
+
+Game.solve runs a depth-first search over bitmask candidate sets (see
+DepthFirstSolver). The original breadth-first expansion over GameBoard.next_moves
+is kept as Game.breadth_first_solve.
 """
-from math import floor
 
 
 # Constants
 SUDOKU_BOARD_CELLS = 81
 EMPTY_CELL = 0
 
+# Candidate sets are bitmasks with bit n set if digit n is possible.
+ALL_DIGITS = 0b1111111110
+DIGITS = [[n for n in range(1, 10) if mask >> n & 1] for mask in range(1 << 10)]
+COUNTS = [len(digits) for digits in DIGITS]
+
+ROW = [pos // 9 for pos in range(SUDOKU_BOARD_CELLS)]
+COL = [pos % 9 for pos in range(SUDOKU_BOARD_CELLS)]
+BOX = [pos // 27 * 3 + pos % 9 // 3 for pos in range(SUDOKU_BOARD_CELLS)]
+UNITS = ([[pos for pos in range(81) if ROW[pos] == n] for n in range(9)] +
+         [[pos for pos in range(81) if COL[pos] == n] for n in range(9)] +
+         [[pos for pos in range(81) if BOX[pos] == n] for n in range(9)])
+
 
 #
 # GameBoard
@@ -73,12 +88,9 @@ class GameBoard:
         return True
 
     def row_num_for_cell(self, cell_pos):
-        for row in range(9):
-            min = row * 9
-            max = min + 9
-            if cell_pos in range(min, max):
-                return row
-        raise ValueError("Invalid cell position: {}".format(cell_pos))
+        if not 0 <= cell_pos < SUDOKU_BOARD_CELLS:
+            raise ValueError("Invalid cell position: {}".format(cell_pos))
+        return cell_pos // 9
 
     def col_num_for_cell(self, cell_pos):
         return cell_pos % 9
@@ -101,8 +113,8 @@ class GameBoard:
         values = []
 
         # Board is a 3x3 grid of 3x3 grids.
-        grid_row_num = floor(row_num / 3) * 3
-        grid_col_num = floor(col_num / 3) * 3
+        grid_row_num = row_num // 3 * 3
+        grid_col_num = col_num // 3 * 3
 
         for n in range(3):
             next_row_num = grid_row_num + n
@@ -127,12 +139,170 @@ class GameBoard:
         return '<GameBoard cells={}>'.format(self.cell_values)
 
 
+#
+# DepthFirstSolver
+#
+class DepthFirstSolver:
+    """Depth-first search over a flat list of cell values plus used-digit
+    bitmasks for each row, column and box. A cell's candidates are the digits
+    used in none of its three units.
+
+    Before each branch, propagate fills every naked single (a cell with one
+    candidate) and hidden single (a digit with one possible cell in a unit).
+    The search then branches on the open cell with the fewest candidates, or
+    on the fewest places left for a digit in a unit if that is smaller.
+    Branches copy the 81 values and 27 masks, which is cheap enough that there
+    is no undo log.
+    """
+    def __init__(self):
+        # Search nodes visited by the last solve.
+        self.nodes = 0
+
+    #
+    # Public Methods
+    #
+    def solve(self, cell_values):
+        """Returns the solved list of 81 values, or None if there is no
+        solution.
+        """
+        self.nodes = 0
+        cells = [EMPTY_CELL] * SUDOKU_BOARD_CELLS
+        rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+
+        for pos, value in enumerate(cell_values):
+            if value == EMPTY_CELL:
+                continue
+            if self.candidates(pos, rows, cols, boxes) >> value & 1 == 0:
+                return None
+            self.place(pos, value, cells, rows, cols, boxes)
+
+        return self.search(cells, rows, cols, boxes)
+
+    #
+    # Private Methods
+    #
+    def search(self, cells, rows, cols, boxes):
+        self.nodes += 1
+        if not self.propagate(cells, rows, cols, boxes):
+            return None
+
+        branches = self.branches(cells, rows, cols, boxes)
+        if branches is None:
+            return cells
+
+        for pos, value in branches:
+            branch = cells[:], rows[:], cols[:], boxes[:]
+            self.place(pos, value, *branch)
+            solution = self.search(*branch)
+            if solution:
+                return solution
+
+        return None
+
+    def branches(self, cells, rows, cols, boxes):
+        """Returns the (pos, value) moves to try next, or None if the board is
+        full. Branches on the open cell with the fewest candidates, unless some
+        digit has fewer possible cells in one of its units, in which case it
+        branches on where that digit goes.
+        """
+        best_pos, best_count, best_candidates = None, 10, 0
+        for pos in range(SUDOKU_BOARD_CELLS):
+            if cells[pos] == EMPTY_CELL:
+                candidates = self.candidates(pos, rows, cols, boxes)
+                if COUNTS[candidates] < best_count:
+                    best_pos, best_count, best_candidates = pos, COUNTS[candidates], candidates
+                    if best_count == 2:
+                        break
+
+        if best_pos is None:
+            return None
+
+        branches = [(best_pos, value) for value in DIGITS[best_candidates]]
+        if best_count == 2:
+            return branches
+
+        for unit in UNITS:
+            open_cells = [(pos, self.candidates(pos, rows, cols, boxes))
+                          for pos in unit if cells[pos] == EMPTY_CELL]
+            for value in range(1, 10):
+                places = [pos for pos, candidates in open_cells if candidates >> value & 1]
+                if 1 < len(places) < len(branches):
+                    branches = [(pos, value) for pos in places]
+
+        return branches
+
+    def propagate(self, cells, rows, cols, boxes):
+        """Places singles until none are left. Returns False on a
+        contradiction.
+        """
+        placed = True
+        while placed:
+            placed = False
+
+            # Naked singles
+            for pos in range(SUDOKU_BOARD_CELLS):
+                if cells[pos] == EMPTY_CELL:
+                    candidates = self.candidates(pos, rows, cols, boxes)
+                    if candidates == 0:
+                        return False
+                    if COUNTS[candidates] == 1:
+                        self.place(pos, DIGITS[candidates][0], cells, rows, cols, boxes)
+                        placed = True
+
+            # Hidden singles
+            for unit in UNITS:
+                once = twice = filled = 0
+                for pos in unit:
+                    if cells[pos] == EMPTY_CELL:
+                        candidates = self.candidates(pos, rows, cols, boxes)
+                        twice |= once & candidates
+                        once |= candidates
+                    else:
+                        filled |= 1 << cells[pos]
+
+                if once | filled != ALL_DIGITS:
+                    return False
+
+                for value in DIGITS[once & ~twice]:
+                    pos = self.only_cell_for(value, unit, cells, rows, cols, boxes)
+                    if pos is None:
+                        return False
+                    self.place(pos, value, cells, rows, cols, boxes)
+                    placed = True
+
+        return True
+
+    def only_cell_for(self, value, unit, cells, rows, cols, boxes):
+        # Candidates only shrink, so a digit that had one cell has at most one.
+        for pos in unit:
+            if cells[pos] == EMPTY_CELL and self.candidates(pos, rows, cols, boxes) >> value & 1:
+                return pos
+        return None
+
+    @staticmethod
+    def candidates(pos, rows, cols, boxes):
+        return ALL_DIGITS & ~(rows[ROW[pos]] | cols[COL[pos]] | boxes[BOX[pos]])
+
+    @staticmethod
+    def place(pos, value, cells, rows, cols, boxes):
+        bit = 1 << value
+        cells[pos] = value
+        rows[ROW[pos]] |= bit
+        cols[COL[pos]] |= bit
+        boxes[BOX[pos]] |= bit
+
+
 #
 # Game
 #
 class Game:
     @staticmethod
     def solve(board):
+        cell_values = DepthFirstSolver().solve(board.cell_values)
+        return GameBoard(*cell_values) if cell_values else None
+
+    @staticmethod
+    def breadth_first_solve(board):
         active_boards = [board]
 
         while active_boards:
@@ -4,11 +4,26 @@ Some commonly used constants and methods.
 Usage:
 from config import INPUT_FILE
 
+To instrument hot paths:
+from common import instruments
+instruments.count('mutations')
+with instruments.timer('mutate'):
+    ...
+
+Counters and timers are no-ops unless AOC_INSTRUMENTS is set in the environment
+(AOC_INSTRUMENTS=10 times only every 10th pass through each timer) or the day is
+run through instrument.py.
+
 To profile:
+$ python 2015/instrument.py day-19 --cprofile --tracemalloc
 $ python -m cProfile -s cumtime 2015/day-00.py
 """
+from os import environ
 from os.path import dirname, join as path_join
-from functools import cached_property
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from functools import cached_property, wraps
+from operator import add
 import time
 import string
 import re
@@ -26,21 +41,127 @@ ALPHA_LOWER = string.ascii_lowercase
 # Periodic logger
 def info(msg, freq=1):
     # https://stackoverflow.com/q/279561/1093087
-    try:
-        ts = time.time()
-        info.split_time = ts - info.last_ts
-    except AttributeError:
-        info.split_time = 0
-    try:
-        info.counter += 1
-    except AttributeError:
-        info.counter = 0
+    # Called in hot loops, so only count here: the clock is read when printing. msg may
+    # be a callable (e.g. a lambda wrapping an f-string) so skipped calls don't format it.
+    info.counter += 1
     if info.counter % freq == 0:
+        ts = time.time()
+        info.split_time = ts - info.last_ts if info.last_ts else 0
         info.last_ts = ts
+        if callable(msg):
+            msg = msg()
         print(f"[info:{info.counter}] ({info.split_time:.3f}) {msg}")
     return info
 
 
+info.counter = -1
+info.last_ts = None
+info.split_time = 0
+
+
+# Instrumentation
+class Instruments:
+    """Named counters and timers for hot paths.
+
+    When disabled, count and timer are bound to functions that do nothing (timer
+    hands back one shared nullcontext), so a call costs one attribute lookup and one
+    call. timed() returns the function unwrapped. With sample_every=N, timers only
+    read the clock on every Nth pass and scale their totals up to match.
+    """
+    def __init__(self, enabled=False, sample_every=1):
+        self.counters = Counter()
+        self.timer_calls = Counter()
+        self.timer_samples = Counter()
+        self.timer_seconds = defaultdict(float)
+        self.configure(enabled, sample_every)
+
+    def configure(self, enabled=True, sample_every=1):
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        if enabled:
+            self.count = self.add_count
+            self.timer = self.start_timer
+        else:
+            self.count = ignore
+            self.timer = null_timer
+
+    def timed(self, name=None):
+        """Decorator timing each call. Takes effect only if enabled when applied."""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            label = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(label):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_count(self, name, n=1):
+        self.counters[name] += n
+
+    def start_timer(self, name):
+        self.timer_calls[name] += 1
+        if self.timer_calls[name] % self.sample_every:
+            return NULL_TIMER
+        return InstrumentTimer(self, name)
+
+    def stop_timer(self, name, seconds):
+        self.timer_samples[name] += 1
+        self.timer_seconds[name] += seconds
+
+    def report(self):
+        lines = []
+        for name, n in self.counters.most_common():
+            lines.append(f"{name:<40} {n:>14,}")
+        for name, seconds in sorted(self.timer_seconds.items(), key=lambda kv: -kv[1]):
+            calls = self.timer_calls[name]
+            total = seconds * calls / self.timer_samples[name]
+            lines.append(f"{name:<40} {calls:>14,} calls {total:>10.3f}s"
+                         f" {total / calls * 1e6:>10.2f}us/call")
+        return '\n'.join(lines)
+
+    def reset(self):
+        for tally in (self.counters, self.timer_calls, self.timer_samples, self.timer_seconds):
+            tally.clear()
+
+
+class InstrumentTimer:
+    __slots__ = ('instruments', 'name', 'started')
+
+    def __init__(self, instruments, name):
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instruments.stop_timer(self.name, time.perf_counter() - self.started)
+
+
+NULL_TIMER = nullcontext()
+
+
+def ignore(name, n=1):
+    pass
+
+
+def null_timer(name):
+    return NULL_TIMER
+
+
+AOC_INSTRUMENTS = environ.get('AOC_INSTRUMENTS')
+instruments = Instruments(
+    enabled=AOC_INSTRUMENTS is not None,
+    sample_every=int(AOC_INSTRUMENTS) if (AOC_INSTRUMENTS or '').isdigit() else 1
+)
+
+
 # Extract Numbers
 def extract_numbers(str_value, num_type=int):
     # https://stackoverflow.com/a/63619831/1093087
@@ -111,7 +232,7 @@ class Grid:
     def cardinal_neighbors(self, pt):
         # N, S, E, W
         pts = []
-        deltas = [(-1, 0), (1, 0), (1, 0), (-1, 0)]
+        deltas = [(0, -1), (0, 1), (1, 0), (-1, 0)]
         x, y = pt
 
         for dx, dy in deltas:
@@ -123,3 +244,122 @@ class Grid:
                 pts.append(npt)
 
         return pts
+
+
+# ArrayGrid
+class ArrayGrid:
+    """Grid with the same pts/neighbors/min_x..max_y API as Grid, but stored as one
+    flat list of cell values, row by row, with each cell's neighbor indexes worked out
+    once up front.
+
+    neighbor_counts counts, for every cell at once, how many neighbors hold a value:
+    a 3x3 convolution done as the sum of eight shifted slices of a zero-padded 0/1
+    bytearray, so the per-cell work runs in map rather than Python loops. Cellular
+    automata (see 2015 day 18) step a whole grid with one call.
+
+    Grid values are read and written as grid[pt] or, faster, through cells by index.
+    """
+    DELTAS = [  # Clockwise from NW to W
+        (-1, -1), (0, -1), (1, -1), (1, 0),
+        (1, 1), (0, 1), (-1, 1), (-1, 0)
+    ]
+    CARDINAL_DELTAS = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+
+    def __init__(self, input):
+        self.input = input.strip()
+        self.cells = [val for row in self.rows for val in row]
+
+    @cached_property
+    def rows(self):
+        return [list(line) for line in self.input.split('\n')]
+
+    @cached_property
+    def width(self):
+        return len(self.rows[0])
+
+    @cached_property
+    def height(self):
+        return len(self.rows)
+
+    @cached_property
+    def pts(self):
+        return [(x, y) for y in range(self.height) for x in range(self.width)]
+
+    @cached_property
+    def min_x(self):
+        return 0
+
+    @cached_property
+    def max_x(self):
+        return self.width - 1
+
+    @cached_property
+    def min_y(self):
+        return 0
+
+    @cached_property
+    def max_y(self):
+        return self.height - 1
+
+    @cached_property
+    def neighbor_indexes(self):
+        return self.index_table(self.DELTAS)
+
+    @cached_property
+    def cardinal_neighbor_indexes(self):
+        return self.index_table(self.CARDINAL_DELTAS)
+
+    def index(self, pt):
+        x, y = pt
+        return y * self.width + x
+
+    def neighbors(self, pt):
+        return [self.pts[n] for n in self.neighbor_indexes[self.index(pt)]]
+
+    def cardinal_neighbors(self, pt):
+        return [self.pts[n] for n in self.cardinal_neighbor_indexes[self.index(pt)]]
+
+    def count(self, value):
+        return self.cells.count(value)
+
+    def neighbor_counts(self, value):
+        """Returns, for each cell index, how many of its 8 neighbors equal value."""
+        width, height = self.width, self.height
+        padded_width = width + 2
+
+        # Matching cells as 1s, with a border of 0s so edge cells need no bounds checks.
+        padded = bytearray(padded_width * (height + 2))
+        matches = bytes(map(value.__eq__, self.cells))
+        for y in range(height):
+            start = (y + 1) * padded_width + 1
+            padded[start:start + width] = matches[y * width:(y + 1) * width]
+
+        # Sum the 8 neighbor offsets over the span from the first to the last inner cell.
+        first = padded_width + 1
+        span = height * padded_width - 2
+        shifted = [padded[first + dy * padded_width + dx:][:span] for dx, dy in self.DELTAS]
+        totals = shifted[0]
+        for other in shifted[1:]:
+            totals = list(map(add, totals, other))
+
+        # Drop the border columns that the span crosses between rows.
+        counts = []
+        for y in range(height):
+            counts += totals[y * padded_width:y * padded_width + width]
+        return counts
+
+    def index_table(self, deltas):
+        table = []
+        for y in range(self.height):
+            for x in range(self.width):
+                table.append([
+                    (y + dy) * self.width + x + dx for dx, dy in deltas
+                    if 0 <= x + dx < self.width and 0 <= y + dy < self.height
+                ])
+        return table
+
+    def __getitem__(self, pt):
+        return self.cells[self.index(pt)]
+
+    def __setitem__(self, pt, value):
+        self.cells[self.index(pt)] = value
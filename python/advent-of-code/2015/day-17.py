@@ -4,18 +4,21 @@ https://adventofcode.com/2015/day/17
 """
 from os.path import join as path_join
 from functools import cached_property
-from common import INPUT_DIR, info
+from common import INPUT_DIR, info, instruments
 
 
 # Source: https://stackoverflow.com/a/71754403/1093087
+@instruments.timed('subset_sum')
 def subset_sum(array, num):
     result = []
 
     def find(arr, num, path=()):
-        info((arr, num, path), 20000)
+        instruments.count('subset_sum.find')
+        info(lambda: (arr, num, path), 20000)
         if not arr:
             return
         if arr[0] == num:
+            instruments.count('subset_sum.subsets')
             result.append(path + (arr[0],))
         else:
             if num - arr[0] > 0:
@@ -6,39 +6,37 @@ Day 18: Like a GIF For Your Yard
 """
 from os.path import join as path_join
 from functools import cached_property
-from common import INPUT_DIR, Grid, info
+from common import INPUT_DIR, ArrayGrid, info
 
 
-class AnimatedLightGrid(Grid):
+class AnimatedLightGrid(ArrayGrid):
     @property
     def lit_lights(self):
-        return [pt for pt in self.pts if self.grid[pt] == '#']
+        return [pt for pt, value in zip(self.pts, self.cells) if value == '#']
 
     def animate(self, steps):
         for n in range(steps):
             info(f"step {n}", 10)
-            grid = self.animate_step()
-            self.grid = grid
+            self.cells = self.animate_step()
         return len(self.lit_lights)
 
     def faulty_animate(self, steps):
         # four lights, one in each corner, are stuck on and can't be turned off
         for n in range(steps):
             info(f"step {n}", 10)
-            self.grid = self.light_corners(self.grid)
-            grid = self.animate_step()
-            self.grid = grid
-        self.grid = self.light_corners(self.grid)
+            self.light_corners()
+            self.cells = self.animate_step()
+        self.light_corners()
         return len(self.lit_lights)
 
     def animate_step(self):
-        next_grid = {}
-        for pt in self.pts:
-            value = self.animate_pt(pt)
-            next_grid[pt] = value
-        return next_grid
+        # A light which is on stays on when 2 or 3 neighbors are on, and turns off otherwise.
+        # A light which is off turns on if exactly 3 neighbors are on, and stays off otherwise.
+        neighbors_on = self.neighbor_counts('#')
+        return ['#' if count == 3 or (count == 2 and value == '#') else '.'
+                for value, count in zip(self.cells, neighbors_on)]
 
-    def light_corners(self, grid):
+    def light_corners(self):
         corner = {
             'nw': (self.min_x, self.min_y),
             'ne': (self.max_x, self.min_y),
@@ -46,29 +44,7 @@ class AnimatedLightGrid(Grid):
             'sw': (self.min_x, self.max_y)
         }
         for pt in corner.values():
-            grid[pt] = '#'
-        return grid
-
-    def animate_pt(self, pt):
-        before = self.grid[pt]
-        is_on = before == '#'
-        neighbors_on = 0
-
-        for npt in self.neighbors(pt):
-            if self.grid[npt] == '#':
-                neighbors_on += 1
-
-        # A light which is on stays on when 2 or 3 neighbors are on, and turns off otherwise.
-        if is_on:
-            stays_on = neighbors_on in (2, 3)
-            after = '#' if stays_on else '.'
-
-        # A light which is off turns on if exactly 3 neighbors are on, and stays off otherwise.
-        else:
-            turns_on = neighbors_on == 3
-            after = '#' if turns_on else '.'
-
-        return after
+            self[pt] = '#'
 
 
 class AdventPuzzle:
@@ -117,7 +93,7 @@ class AdventPuzzle:
 
         grid = AnimatedLightGrid(input)
         neighbors = grid.neighbors((1, 3))
-        lit_neighbors = [pt for pt in neighbors if grid.grid[pt] == '#']
+        lit_neighbors = [pt for pt in neighbors if grid[pt] == '#']
         assert len(grid.pts) == 36, len(grid.pts)
         assert len(neighbors) == 8, neighbors
         assert len(lit_neighbors) == 4, lit_neighbors
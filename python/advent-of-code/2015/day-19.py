@@ -9,7 +9,7 @@ from functools import cached_property
 from queue import PriorityQueue
 from functools import total_ordering
 import random
-from common import INPUT_DIR, info
+from common import INPUT_DIR, info, instruments
 
 
 class NorthPoleReactor:
@@ -68,6 +68,7 @@ class NorthPoleReactor:
             mutants.append(mutant)
         return mutants
 
+    @instruments.timed('NorthPoleReactor.mutate_at')
     def mutate_at(self, code, index):
         distinct_mutants = set()
         for transform in self.mutations:
@@ -82,10 +83,11 @@ class NorthPoleReactor:
         find_len = len(find)
         end = len(code)-find_len+1
         start = index
+        instruments.count('transform_rna_at.segments', max(0, end - start))
         for n in range(start, end):
             seg_end = n+find_len
             segment = code[n:seg_end]
-            info(f"{find} {segment}", 1000000)
+            info(lambda: f"{find} {segment}", 1000000)
             if segment == find:
                 mutant = code[0:n] + replace + code[seg_end:]
                 mutants.add(mutant)
@@ -118,7 +120,8 @@ class NorthPoleReactor:
             mutants = rna.mutate(self)
 
             for mutant in mutants:
-                info((queue.qsize(), discards, len(cloned), rna, leader), 1000)
+                instruments.count('synthesize_molecule.mutants')
+                info(lambda: (queue.qsize(), discards, len(cloned), rna, leader), 1000)
 
                 if mutant.is_complete():
                     cloned.append(mutant)
@@ -178,6 +181,7 @@ class Molecule:
             for reaction in mutations:
                 reactant, product = reaction
                 while product in self.code:
+                    instruments.count('Molecule.to_e.replacements')
                     code = self.code.replace(product, reactant, 1)
                     self.evolve(code)
 
@@ -187,6 +191,7 @@ class Molecule:
 
         return self.steps
 
+    @instruments.timed('Molecule.mutate_code')
     def mutate_code(self, mutation):
         mutant_codes = set()
         n = 0
@@ -195,7 +200,7 @@ class Molecule:
         for n in range(self.length-find_len+1):
             seg_end = n+find_len
             segment = self.code[n:seg_end]
-            info(f"{find} {segment}", 1000000)
+            info(lambda: f"{find} {segment}", 1000000)
             if segment == find:
                 mutant_code = self.code[0:n] + replace + self.code[seg_end:]
                 mutant_codes.add(mutant_code)
@@ -0,0 +1,176 @@
+"""
+Runs a day module under profilers and writes a summary of where the time and
+memory went.
+
+--cprofile      hottest functions by own time and by cumulative time (cProfile)
+--tracemalloc   peak traced memory and the lines that allocated the most
+--sample        statistical profile: the running line is sampled on a CPU-time
+                timer, so overhead stays low enough for long runs (Unix only)
+
+Counters and timers from common.instruments are always enabled for the run
+and included in the summary.
+
+Usage:
+python 2015/instrument.py day-19
+python 2015/instrument.py 17 --tracemalloc --sample --top 20 --out day-17-profile.txt
+python 2015/instrument.py ../2022/day-12.py --sample
+"""
+import argparse
+import cProfile
+import importlib.util
+import io
+import pstats
+import runpy
+import signal
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from os.path import abspath, basename, dirname, exists, join as path_join
+
+
+SAMPLE_INTERVAL = 0.001
+
+
+def load_common():
+    # Loaded by path under its own name: a plain "import common" would leave
+    # 2015's module cached as "common" for days in other years' directories.
+    path = path_join(dirname(abspath(__file__)), 'common.py')
+    spec = importlib.util.spec_from_file_location('aoc_2015_common', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+common = load_common()
+ROOT_DIR, instruments = common.ROOT_DIR, common.instruments
+
+
+def day_path(day):
+    for path in (day, path_join(ROOT_DIR, day), path_join(ROOT_DIR, day + '.py'),
+                 path_join(ROOT_DIR, 'day-{:0>2}.py'.format(day))):
+        if exists(path) and path.endswith('.py'):
+            return abspath(path)
+    raise ValueError('No day module found for {}'.format(day))
+
+
+class Sampler:
+    """Counts the line running each time the CPU-time timer fires."""
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+
+    def __enter__(self):
+        signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def sample(self, signum, frame):
+        code = frame.f_code
+        self.samples[(basename(code.co_filename), frame.f_lineno, code.co_name)] += 1
+
+    def report(self, top):
+        total = sum(self.samples.values()) or 1
+        lines = ['{} samples every {:g}ms of CPU time'.format(total, self.interval * 1000)]
+        for (filename, lineno, name), n in self.samples.most_common(top):
+            lines.append('{:>6.1%} {:>6}  {}:{} {}'.format(n / total, n, filename, lineno, name))
+        return '\n'.join(lines)
+
+
+def run_day(path):
+    # Day modules import common/config from their own directory and solve on import.
+    # 2015 days get the common module loaded here, so they share its instruments.
+    saved = sys.modules.pop('common', None)
+    if dirname(path) == ROOT_DIR:
+        sys.modules['common'] = common
+    sys.path.insert(0, dirname(path))
+    try:
+        runpy.run_path(path, run_name='__main__')
+    finally:
+        sys.path.remove(dirname(path))
+        sys.modules.pop('common', None)
+        if saved:
+            sys.modules['common'] = saved
+
+
+def profile(path, use_cprofile=True, use_tracemalloc=False, use_sampler=False, top=15):
+    sections = []
+    instruments.reset()
+    instruments.configure(enabled=True, sample_every=instruments.sample_every)
+
+    profiler = cProfile.Profile() if use_cprofile else None
+    sampler = Sampler() if use_sampler else None
+    if use_tracemalloc:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    try:
+        if sampler:
+            sampler.__enter__()
+        if profiler:
+            profiler.enable()
+        run_day(path)
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.__exit__()
+    elapsed = time.perf_counter() - started
+
+    sections.append(('Run', '{} in {:.3f}s (profiler overhead included)'.format(
+        basename(path), elapsed)))
+
+    if use_tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        # Snapshot before the reports below allocate anything.
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:top]
+        tracemalloc.stop()
+        lines = ['peak {:.1f} MiB, still allocated at exit {:.1f} MiB'.format(
+            peak / 2 ** 20, current / 2 ** 20)]
+        lines += [str(stat) for stat in stats]
+        sections.append(('tracemalloc', '\n'.join(lines)))
+
+    if profiler:
+        for sort in ('tottime', 'cumulative'):
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(top)
+            # Skip pstats' preamble; keep from the column headings down.
+            table = out.getvalue()
+            sections.append(('cProfile by ' + sort, table[table.find('   ncalls'):].rstrip()))
+
+    if sampler:
+        sections.append(('Samples', sampler.report(top)))
+
+    report = instruments.report()
+    if report:
+        sections.append(('Instruments', report))
+
+    return '\n\n'.join('== {} ==\n{}'.format(title, body) for title, body in sections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile an Advent of Code day module.')
+    parser.add_argument('day', help='day-19, 19 or a path to any day module')
+    parser.add_argument('--cprofile', action='store_true')
+    parser.add_argument('--tracemalloc', action='store_true')
+    parser.add_argument('--sample', action='store_true')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--out', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    # cProfile unless something else was asked for.
+    use_cprofile = args.cprofile or not (args.tracemalloc or args.sample)
+    summary = profile(day_path(args.day), use_cprofile, args.tracemalloc, args.sample, args.top)
+
+    print('\n' + summary)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(summary + '\n')
+
+
+if __name__ == '__main__':
+    main()
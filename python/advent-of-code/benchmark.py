@@ -0,0 +1,341 @@
+"""
+Benchmark runner for every Advent of Code day module.
+
+Finds each <year>/day-NN.py (2015, 2020, 2021, 2022) and runs part 1 and part
+2 separately, each in its own subprocess with a timeout. Records wall time,
+CPU time, peak RSS and the answer for each part. Each run is appended to a JSON
+history and a CSV, then compared with the previous run for the same label
+(the interpreter version by default). Slower or bigger parts, failures and
+changed answers are flagged. Parts that failed before and work now are listed
+as recovered, but not flagged.
+
+Day modules solve everything at import, so they are not imported as-is. The
+child process parses the module and drops its top-level print()/solve()
+calls. From the dropped prints it takes the "pt 1"/"Part 1" expressions (for
+2015, puzzle.first and puzzle.second). It then runs what's left of the module
+as setup and times the evaluation of the one part it was asked for.
+
+Usage:
+python benchmark.py
+python benchmark.py --years 2022 --days 12 17 --timeout 120
+python benchmark.py --python ~/builds/cpython-main/python --label main
+"""
+import argparse
+import ast
+import csv
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from os.path import abspath, basename, dirname, exists, join as path_join
+
+
+ROOT_DIR = dirname(abspath(__file__))
+YEARS = ['2015', '2020', '2021', '2022']
+HISTORY_DIR = path_join(ROOT_DIR, 'benchmarks')
+TIMEOUT = 60
+SLOWDOWN = 1.25
+MIN_SECONDS = 0.05
+PART_LABEL = re.compile(r'\b(?:pt|part)\s*([12])\b', re.IGNORECASE)
+CSV_FIELDS = ['run', 'label', 'year', 'day', 'part', 'status', 'wall', 'cpu', 'setup',
+              'peak_rss_mib', 'answer']
+
+
+#
+# Discovery
+#
+def discover(years=YEARS, days=None):
+    modules = []
+    for year in years:
+        year_dir = path_join(ROOT_DIR, year)
+        if not exists(year_dir):
+            continue
+        for name in sorted(os.listdir(year_dir)):
+            match = re.fullmatch(r'day-(\d\d)\.py', name)
+            # day-00 is the template each year starts from.
+            if not match or match.group(1) == '00':
+                continue
+            if days and int(match.group(1)) not in days:
+                continue
+            modules.append((year, int(match.group(1)), path_join(year_dir, name)))
+    return modules
+
+
+#
+# Child: runs one part of one module
+#
+def split_module(source):
+    """Returns (setup module AST, {part number: expression AST}). Top-level calls
+    (print, puzzle.solve()) are dropped from setup. Part expressions come from
+    the dropped prints. A print of a bare name takes the expression last assigned
+    to that name, and that assignment is dropped too.
+    """
+    tree = ast.parse(source)
+    body, parts, solvers = [], {}, []
+
+    for node in tree.body:
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            call = node.value
+            if isinstance(call.func, ast.Name) and call.func.id == 'print' and call.args:
+                part, expr = print_part(call.args[0])
+                if part:
+                    if isinstance(expr, ast.Name):
+                        expr = pop_assignment(body, expr.id) or expr
+                    parts[part] = expr
+            elif isinstance(call.func, ast.Attribute) and call.func.attr == 'solve':
+                solvers.append(call.func.value)
+            continue
+        body.append(node)
+
+    # 2015 style: puzzle.solve() prints puzzle.first and puzzle.second itself.
+    if not parts and solvers:
+        for part, attr in ((1, 'first'), (2, 'second')):
+            parts[part] = ast.Attribute(value=solvers[-1], attr=attr, ctx=ast.Load())
+
+    return ast.Module(body=body, type_ignores=[]), parts
+
+
+def print_part(arg):
+    """Returns (part number, expression) for a print argument like
+    "pt 1 solution: {}".format(x) or f"Part 1 Solution: {x}", else (None, None).
+    """
+    func = arg.func if isinstance(arg, ast.Call) else None
+    if isinstance(func, ast.Attribute) and func.attr == 'format' and \
+            isinstance(func.value, ast.Constant) and arg.args:
+        label, expr = func.value.value, arg.args[0]
+    elif isinstance(arg, ast.JoinedStr):
+        label = ''.join(v.value for v in arg.values if isinstance(v, ast.Constant))
+        values = [v.value for v in arg.values if isinstance(v, ast.FormattedValue)]
+        expr = values[0] if values else None
+    else:
+        return None, None
+
+    match = PART_LABEL.search(str(label))
+    if not match or expr is None:
+        return None, None
+    return int(match.group(1)), expr
+
+
+def pop_assignment(body, name):
+    for i in range(len(body) - 1, -1, -1):
+        node = body[i]
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if isinstance(target, ast.Name) and target.id == name:
+            return body.pop(i).value
+    return None
+
+
+def run_part(path, part):
+    """Runs in the child process. Returns the measurements for one part."""
+    with open(path) as f:
+        setup, parts = split_module(f.read())
+    if part not in parts:
+        return {'status': 'no part'}
+
+    sys.path.insert(0, dirname(path))
+    namespace = {'__name__': '__main__', '__file__': path}
+    expr = ast.Expression(body=parts[part])
+
+    # Day modules and their methods print as they go; keep that off our output.
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            started = time.perf_counter()
+            exec(compile(ast.fix_missing_locations(setup), path, 'exec'), namespace)
+            setup_seconds = time.perf_counter() - started
+
+            cpu_started, started = time.process_time(), time.perf_counter()
+            answer = eval(compile(ast.fix_missing_locations(expr), path, 'eval'), namespace)
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+        finally:
+            sys.stdout = stdout
+
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mib = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+    return {
+        'status': 'ok',
+        'wall': wall,
+        'cpu': cpu,
+        'setup': setup_seconds,
+        'peak_rss_mib': peak_mib,
+        'answer': str(answer)[:200],
+        'python': sys.version.split()[0],
+    }
+
+
+#
+# Parent: runs every part in a subprocess
+#
+def measure(python, path, part, timeout):
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as result_file:
+        command = [python, abspath(__file__), '--child', path, str(part), result_file.name]
+        try:
+            completed = subprocess.run(command, timeout=timeout, capture_output=True, text=True)
+        except subprocess.TimeoutExpired:
+            return {'status': 'timeout', 'wall': timeout}
+
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()
+            return {'status': 'error', 'error': error[-1] if error else completed.returncode}
+        return json.load(result_file)
+
+
+def run(python, label, modules, timeout):
+    results = []
+    for year, day, path in modules:
+        for part in (1, 2):
+            result = measure(python, path, part, timeout)
+            if result['status'] == 'no part':
+                continue
+            result.update({'year': year, 'day': day, 'part': part})
+            print(format_result(result))
+            results.append(result)
+
+    return {
+        'run': datetime.now().isoformat(timespec='seconds'),
+        'label': label,
+        'python': python,
+        'results': results,
+    }
+
+
+def format_result(r):
+    if r['status'] != 'ok':
+        return '{year} day {day:>2} pt {part}  {status} {error}'.format(
+            error=r.get('error', ''), **r)
+    return ('{year} day {day:>2} pt {part}  wall {wall:8.3f}s  cpu {cpu:8.3f}s  '
+            'rss {peak_rss_mib:7.1f}MiB  {answer}'.format(**r))
+
+
+#
+# History
+#
+def load_history(path):
+    if not exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(history, run_record, json_path, csv_path):
+    history.append(run_record)
+    with open(json_path, 'w') as f:
+        json.dump(history, f, indent=1)
+
+    new_file = not exists(csv_path)
+    with open(csv_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, CSV_FIELDS, extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        for result in run_record['results']:
+            writer.writerow(dict(result, run=run_record['run'], label=run_record['label']))
+
+
+def baseline(run_record, history):
+    """Returns {(year, day, part): result} from the last earlier run that has
+    the same label, or {} if there is none.
+    """
+    previous = next((r for r in reversed(history) if r['label'] == run_record['label']), None)
+    if not previous:
+        return {}
+    return {(r['year'], r['day'], r['part']): r for r in previous['results']}
+
+
+def regressions(run_record, history, slowdown=SLOWDOWN, min_seconds=MIN_SECONDS):
+    """Compares a run with the last earlier run that has the same label.
+    Returns a list of (result, reason).
+    """
+    before = baseline(run_record, history)
+    flagged = []
+    for result in run_record['results']:
+        base = before.get((result['year'], result['day'], result['part']))
+        if not base:
+            continue
+        if result['status'] != 'ok':
+            # Only a part that used to work regresses by failing; one that
+            # already failed or timed out is not news (see recoveries).
+            if base['status'] == 'ok':
+                flagged.append((result, 'status ok -> {}'.format(result['status'])))
+            continue
+        elif base['status'] != 'ok':
+            continue
+        elif result['answer'] != base['answer']:
+            flagged.append((result, 'answer changed from {}'.format(base['answer'])))
+        elif result['wall'] > max(min_seconds, base['wall'] * slowdown):
+            flagged.append((result, 'wall {:.3f}s -> {:.3f}s'.format(base['wall'], result['wall'])))
+        elif result['peak_rss_mib'] > base['peak_rss_mib'] * slowdown:
+            flagged.append((result, 'peak rss {:.1f} -> {:.1f}MiB'.format(
+                base['peak_rss_mib'], result['peak_rss_mib'])))
+    return flagged
+
+
+def recoveries(run_record, history):
+    """Parts that failed or timed out in the baseline run and work now.
+    Reported for information; they don't count as regressions.
+    """
+    before = baseline(run_record, history)
+    recovered = []
+    for result in run_record['results']:
+        base = before.get((result['year'], result['day'], result['part']))
+        if base and base['status'] != 'ok' and result['status'] == 'ok':
+            recovered.append((result, 'status {} -> ok'.format(base['status'])))
+    return recovered
+
+
+#
+# Main
+#
+def python_version(python):
+    command = [python, '-c', 'import sys; print(sys.version.split()[0])']
+    return subprocess.run(command, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        path, part, result_path = sys.argv[2], int(sys.argv[3]), sys.argv[4]
+        result = run_part(path, part)
+        with open(result_path, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    parser = argparse.ArgumentParser(description='Benchmark Advent of Code solutions.')
+    parser.add_argument('--years', nargs='+', default=YEARS)
+    parser.add_argument('--days', nargs='+', type=int)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help='seconds per part')
+    parser.add_argument('--python', default=sys.executable, help='interpreter to benchmark')
+    parser.add_argument('--label', help='history label to compare against (default: version)')
+    parser.add_argument('--history', default=HISTORY_DIR, help='directory for history files')
+    args = parser.parse_args()
+
+    label = args.label or 'python-' + python_version(args.python)
+    modules = discover(args.years, args.days)
+    run_record = run(args.python, label, modules, args.timeout)
+
+    os.makedirs(args.history, exist_ok=True)
+    json_path = path_join(args.history, 'history.json')
+    history = load_history(json_path)
+    flagged = regressions(run_record, history)
+    recovered = recoveries(run_record, history)
+    save_history(history, run_record, json_path, path_join(args.history, 'history.csv'))
+
+    for result, reason in recovered:
+        print('recovered {year} day {day} pt {part}: {reason}'.format(reason=reason, **result))
+    for result, reason in flagged:
+        print('REGRESSION {year} day {day} pt {part}: {reason}'.format(reason=reason, **result))
+    print('{} parts run, {} regressions, history in {}'.format(
+        len(run_record['results']), len(flagged), basename(args.history)))
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,11 +9,26 @@ Who will flip the coin more times on average: Alice, Bob, or is there no
 difference?
 
 Source: https://www.metafilter.com/147228/You-blew-it-and-you-blew-it-big#5945177
+
+Usage:
+python solution.py
+python solution.py 100000000
+
+Exact values: expected_flips("HH") == 6, expected_flips("HT") == 4
 """
+import os
 import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from statistics import NormalDist
 
 
 COIN_SIDES = ['H', 'T']
+BITS = {'H': '1', 'T': '0'}
+BLOCK_BITS = 1 << 20
+CHUNK_TRIALS = 1 << 22
 
 
 def flip_coin():
@@ -27,7 +42,6 @@ def flip_coin_until(goal, max_flips=1000):
     """
     flips = []
     goal_len = len(goal)
-    max_flips = 1000
 
     for n in range(max_flips):
         flip = flip_coin()
@@ -41,17 +55,183 @@ def flip_coin_until(goal, max_flips=1000):
     raise ValueError("Too many flips: {}".format(len(flips)))
 
 
-def run_trials(goal, trial_size):
+def run_trials(goal, trial_size, max_flips=1000):
     flip_counts = []
 
     for n in range(trial_size):
-        flips = flip_coin_until(goal)
+        flips = flip_coin_until(goal, max_flips)
         flip_count = len(flips)
         flip_counts.append(flip_count)
 
     return sum(flip_counts) / len(flip_counts)
 
 
+#
+# Batched Simulation
+#
+def simulate_chunk(goal, trials, seed):
+    """Runs trials fair-coin trials for goal, a string of 0/1 bits. Returns a
+    Counter of {flips needed: trials}.
+
+    Flips are drawn a block of bits at a time and rendered as a 0/1 string.
+    Splitting that string on goal cuts it at the first occurrence of goal, then
+    at the first occurrence after that, and so on, which is exactly where
+    successive trials end. The unfinished trial at the end of a block carries
+    over into the next.
+    """
+    rng = random.Random(seed)
+    bits = '0{}b'.format(BLOCK_BITS)
+    goal_len = len(goal)
+    counts = Counter()
+    carry = ''
+
+    while trials > 0:
+        pieces = (carry + format(rng.getrandbits(BLOCK_BITS), bits)).split(goal)
+        carry = pieces.pop()
+        del pieces[trials:]
+        counts.update(map(len, pieces))
+        trials -= len(pieces)
+
+    # Keys so far are flips before each goal; add the goal flips themselves.
+    return Counter({flips + goal_len: n for flips, n in counts.items()})
+
+
+def simulate(goal, trials, workers=None, seed=None, confidence=0.95):
+    """Monte Carlo estimate of the expected flips to reach goal (e.g. ["H", "T"]
+    or "HT") with a fair coin. Trials are split into chunks run across workers
+    processes; chunk seeds derive from seed, so results do not depend on the
+    worker count.
+    """
+    goal = ''.join(goal)
+    goal_bits = ''.join(BITS[side] for side in goal)
+    workers = workers or os.cpu_count()
+    seed = random.randrange(1 << 32) if seed is None else seed
+
+    chunks = [(goal_bits, min(CHUNK_TRIALS, trials - start), seed * 1000003 + n)
+              for n, start in enumerate(range(0, trials, CHUNK_TRIALS))]
+
+    counts = Counter()
+    if workers == 1 or len(chunks) == 1:
+        for chunk in chunks:
+            counts.update(simulate_chunk(*chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_counts in executor.map(simulate_chunk, *zip(*chunks)):
+                counts.update(chunk_counts)
+
+    return summarize(goal, counts, confidence)
+
+
+def summarize(goal, counts, confidence=0.95):
+    n = sum(counts.values())
+    mean = sum(flips * k for flips, k in counts.items()) / n
+    variance = sum(k * (flips - mean) ** 2 for flips, k in counts.items()) / max(1, n - 1)
+    stdev = variance ** 0.5
+    margin = NormalDist().inv_cdf((1 + confidence) / 2) * stdev / n ** 0.5
+
+    return {
+        'goal': goal,
+        'trials': n,
+        'mean': mean,
+        'stdev': stdev,
+        'confidence': confidence,
+        'interval': (mean - margin, mean + margin),
+        'max flips': max(counts),
+    }
+
+
+#
+# Exact Solution
+#
+def goal_automaton(goal):
+    """For each state i (the first i flips of goal matched) returns the state
+    reached on the flip that does not extend the match: the longest prefix of
+    goal that is also a suffix of what has been flipped. Built from the KMP
+    failure function.
+    """
+    n = len(goal)
+    failure = [0] * n
+    k = 0
+    for i in range(1, n):
+        while k and goal[i] != goal[k]:
+            k = failure[k - 1]
+        if goal[i] == goal[k]:
+            k += 1
+        failure[i] = k
+
+    transitions = [{} for _ in range(n)]
+    for i in range(n):
+        for side in COIN_SIDES:
+            if side == goal[i]:
+                transitions[i][side] = i + 1
+            else:
+                transitions[i][side] = transitions[failure[i - 1]][side] if i else 0
+
+    return [transitions[i][side] for i, side in enumerate(other_side(s) for s in goal)]
+
+
+def other_side(side):
+    return 'T' if side == 'H' else 'H'
+
+
+def waiting_time(goal, p_heads=Fraction(1, 2)):
+    """Returns the exact (mean, variance) of the number of flips needed to reach
+    goal with a coin that lands heads with probability p_heads. Rationals in,
+    rationals out: the default fair coin gives Fractions.
+
+    The goal automaton only ever advances one state at a time, so the flips
+    spent are the sum of independent climbs A_i from state i to i + 1. From
+    state i the next flip either matches (probability p) or falls back to
+    state j, after which the walker must climb j..i again and retry:
+
+        A_i = 1                       with probability p
+        A_i = 1 + A_j + ... + A_i'    otherwise
+
+    which solves for the mean and second moment of each A_i in turn from
+    the sums of the earlier ones. O(len(goal)^2) in all.
+    """
+    goal = ''.join(goal)
+    fallbacks = goal_automaton(goal)
+    means, variances = [], []
+
+    for i, (side, j) in enumerate(zip(goal, fallbacks)):
+        p = p_heads if side == 'H' else 1 - p_heads
+        q = 1 - p
+        # Climb from the fallback state back up to i.
+        climb_mean = sum(means[j:i])
+        climb_square = sum(variances[j:i]) + climb_mean ** 2
+
+        mean = (1 + q * climb_mean) / p
+        square = (p + q * (1 + climb_square + 2 * climb_mean + 2 * mean * (1 + climb_mean))) / p
+        means.append(mean)
+        variances.append(square - mean ** 2)
+
+    return sum(means), sum(variances)
+
+
+def expected_flips(goal, p_heads=Fraction(1, 2)):
+    return waiting_time(goal, p_heads)[0]
+
+
+def cross_check(goal, trial_size=1000, sigmas=4):
+    """Runs run_trials (fair coin) and compares the average to the exact value.
+    The flip limit is set far enough past the mean that it is never hit in
+    practice.
+    """
+    mean, variance = waiting_time(goal)
+    average = run_trials(list(goal), trial_size, max_flips=int(50 * mean))
+    z = (average - mean) / (variance / trial_size) ** 0.5
+
+    return {
+        'goal': ''.join(goal),
+        'trials': trial_size,
+        'average': average,
+        'expected': float(mean),
+        'z-score': z,
+        'ok': abs(z) <= sigmas,
+    }
+
+
 def solution():
     alice_goal = ["H", "H"]
     bob_goal = ["H", "T"]
@@ -68,3 +248,9 @@ def solution():
 if __name__ == "__main__":
     averages = solution()
     print(averages)
+    print({'alice': float(expected_flips('HH')), 'bob': float(expected_flips('HT'))})
+
+    if len(sys.argv) > 1:
+        trials = int(sys.argv[1])
+        for name, goal in (("alice", "HH"), ("bob", "HT")):
+            print(name, simulate(goal, trials))
@@ -0,0 +1,178 @@
+"""
+Bulk generation and verification of encoded fizzbuzz logs.
+
+BulkPuzzler produces the same kind of log as Puzzler (uniform timestamps,
+ERROR_RATE chance of a wrong label) but draws each batch of records in a worker
+process and base64-encodes the output to disk in chunks. Batches are seeded
+from (seed, batch number), so output does not depend on the worker count.
+
+BulkVerifier splits an encoded file into base64-aligned byte ranges, tallies
+each range in a worker process, stitches the lines cut at range edges, and
+checks the observed error rate against the expected one.
+
+Usage:
+puzzle = BulkPuzzler(10 ** 9, datetime(2023, 1, 1), seed=42)
+puzzle.write('encoded_log.txt', workers=8)
+pprint(BulkVerifier.verify('encoded_log.txt', workers=8))
+"""
+import base64
+import binascii
+import math
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from models.fizzer import Fizzer
+from puzzler import Puzzler
+
+
+LABELS = [label.encode() for label in Fizzer.LABELS]
+WRONG_CODES = [[c for c in range(len(LABELS)) if c != code] for code in range(len(LABELS))]
+
+
+def generate_batch(start_ts, end_ts, error_rate, count, seed):
+    """Returns count newline-joined log lines as bytes."""
+    rng = random.Random(seed)
+    randint, rand, choice = rng.randint, rng.random, rng.choice
+    lines = []
+
+    for ts in [randint(start_ts, end_ts) for _ in range(count)]:
+        code = Fizzer.label_code(ts)
+        if rand() < error_rate:
+            code = choice(WRONG_CODES[code])
+        lines.append(b'%d%s' % (ts, LABELS[code]))
+
+    return b'\n'.join(lines)
+
+
+def tally(lines):
+    """Returns [logs, mistakes by correct label code...] for the given lines."""
+    counts = [0] * (1 + len(LABELS))
+    codes = {label: code for code, label in enumerate(LABELS)}
+
+    for line in lines:
+        counts[0] += 1
+        code = Fizzer.label_code(int(line[:10]))
+        if codes.get(line[10:]) != code:
+            counts[1 + code] += 1
+
+    return counts
+
+
+def tally_range(path, start, end):
+    """Tallies the whole lines in a base64-aligned byte range of path. Returns
+    the partial first and last lines untallied so they can be stitched to
+    the neighbouring ranges.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = binascii.a2b_base64(f.read(end - start)).split(b'\n')
+
+    head = lines.pop(0)
+    tail = lines.pop() if lines else None
+    return head, tally(lines), tail
+
+
+class BulkPuzzler(Puzzler):
+    BATCH_SIZE = 500000
+
+    def __init__(self, count, start_date, days=7, seed=None):
+        super().__init__(count, start_date, days)
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+
+    def batches(self):
+        for n, start in enumerate(range(0, self.count, self.BATCH_SIZE)):
+            size = min(self.BATCH_SIZE, self.count - start)
+            yield (self.start_ts, self.end_ts, self.ERROR_RATE, size, self.seed * 1000003 + n)
+
+    def write(self, fname='encoded_log.txt', workers=None):
+        """Writes the encoded logs to fname, generating batches in parallel but
+        encoding and writing them in order. At most two batches per worker are
+        in flight, which bounds memory.
+        """
+        self.fname = fname
+        workers = workers or os.cpu_count()
+        batches = self.batches()
+        in_flight = deque()
+        pending = b''
+        first = True
+
+        with open(self.fname, 'wb') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                while len(in_flight) < 2 * workers:
+                    args = next(batches, None)
+                    if args is None:
+                        break
+                    in_flight.append(executor.submit(generate_batch, *args))
+                if not in_flight:
+                    break
+
+                pending += (b'' if first else b'\n') + in_flight.popleft().result()
+                first = False
+                # Only encode whole 3-byte groups so chunks concatenate cleanly.
+                cut = len(pending) - len(pending) % 3
+                f.write(base64.b64encode(pending[:cut]))
+                pending = pending[cut:]
+
+            f.write(base64.b64encode(pending))
+
+        return self.fname
+
+
+class BulkVerifier:
+    # Ranges are capped at this size so each worker's decode stays small.
+    RANGE_BYTES = 64 << 20
+
+    @staticmethod
+    def verify(fname, workers=None, error_rate=Puzzler.ERROR_RATE, sigmas=4):
+        counts = BulkVerifier.tally_file(fname, workers)
+        logs, mistakes = counts[0], sum(counts[1:])
+
+        # An empty file has no error rate to test, so it can't pass.
+        observed = mistakes / logs if logs else None
+        z = None
+        if logs:
+            z = (observed - error_rate) / math.sqrt(error_rate * (1 - error_rate) / logs)
+
+        return {
+            'logs': logs,
+            'mistakes': mistakes,
+            'error rate': observed,
+            'expected error rate': error_rate,
+            'z-score': z,
+            'ok': z is not None and abs(z) <= sigmas,
+            'mistakes by value': dict(zip(Fizzer.LABELS, counts[1:]))
+        }
+
+    @staticmethod
+    def tally_file(fname, workers=None):
+        workers = workers or os.cpu_count()
+        size = os.path.getsize(fname)
+        ranges = BulkVerifier.ranges(fname, max(workers, -(-size // BulkVerifier.RANGE_BYTES)))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(tally_range, *zip(*[(fname, s, e) for s, e in ranges])))
+
+        # Stitch the line cut at each range edge back together.
+        counts = [0] * (1 + len(LABELS))
+        carry = b''
+        for head, range_counts, tail in results:
+            if tail is None:
+                carry += head
+                continue
+            edge_counts = tally([carry + head])
+            counts = [a + b + c for a, b, c in zip(counts, range_counts, edge_counts)]
+            carry = tail
+
+        if carry:
+            counts = [a + b for a, b in zip(counts, tally([carry]))]
+        return counts
+
+    @staticmethod
+    def ranges(fname, count):
+        """Byte ranges cut on 4-byte base64 quanta. Assumes the encoded file
+        has no line breaks, as BulkPuzzler and Puzzler.to_file write it.
+        """
+        quanta = os.path.getsize(fname) // 4
+        bounds = sorted(set(quanta * n // count * 4 for n in range(count + 1)))
+        return list(zip(bounds[:-1], bounds[1:]))
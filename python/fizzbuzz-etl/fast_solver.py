@@ -0,0 +1,145 @@
+"""
+Single-pass alternative to Solver for large encoded logs.
+
+The payload is base64-decoded once, chunk by chunk, and parsed into blocks of integer
+timestamps and label codes (see Fizzer.LABELS). Each block is folded into
+running aggregates: correct labels come from modulo arithmetic over the whole
+block and weekdays from epoch seconds, so no Fizzer or datetime is built per
+record. report() returns the same dict as Solver.report().
+
+Usage:
+solution = FastSolver.solve(puzzle.encoded_logs)
+solution = FastSolver.from_file('encoded_log.txt')   # streamed, see log_reader
+pprint(solution.report())
+"""
+import calendar
+import time
+from array import array
+from datetime import datetime
+from itertools import compress
+from operator import eq, ne
+from log_reader import EncodedLogReader
+from models.fizzer import Fizzer
+
+
+LABEL_CODES = {label.encode(): code for code, label in enumerate(Fizzer.LABELS)}
+FIZZBUZZ = Fizzer.LABELS.index('fizzbuzz')
+EPOCH_WEEKDAY = 3   # 1970-01-01 was a Thursday (Monday is 0)
+
+
+class FastSolver:
+    BLOCK_SIZE = 1 << 16
+    OFFSET_BUCKET_SECONDS = 900
+
+    @staticmethod
+    def solve(encoded_logs):
+        reader = EncodedLogReader.from_buffer(encoded_logs)
+        return FastSolver().consume(FastSolver.parse_blocks(reader.lines()))
+
+    @staticmethod
+    def from_file(path, use_mmap=False):
+        reader = EncodedLogReader.from_file(path, use_mmap)
+        return FastSolver().consume(FastSolver.parse_blocks(reader.lines()))
+
+    @staticmethod
+    def parse_blocks(lines, block_size=None):
+        """Yields (timestamps, labels) arrays for each block of log lines."""
+        block_size = block_size or FastSolver.BLOCK_SIZE
+        timestamps = array('q')
+        labels = array('b')
+
+        for line in lines:
+            timestamps.append(int(line[:10]))
+            label = line[10:].rstrip(b'\r')
+            if label not in LABEL_CODES:
+                raise ValueError('Unrecognized label: {}'.format(line))
+            labels.append(LABEL_CODES[label])
+
+            if len(timestamps) >= block_size:
+                yield timestamps, labels
+                timestamps = array('q')
+                labels = array('b')
+
+        if timestamps:
+            yield timestamps, labels
+
+    def __init__(self):
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.mistake_logs = []
+        self.mistake_counts = [0] * len(Fizzer.LABELS)
+        self.fizzbuzz_weekdays = [0] * 7
+        self.utc_offsets = {}
+
+    #
+    # Aggregation
+    #
+    def consume(self, blocks):
+        for timestamps, labels in blocks:
+            self.add_block(timestamps, labels)
+        return self
+
+    def add_block(self, timestamps, labels):
+        correct = array('b', map(Fizzer.label_code, timestamps))
+
+        self.count += len(timestamps)
+        first, last = min(timestamps), max(timestamps)
+        self.first_ts = first if self.first_ts is None else min(self.first_ts, first)
+        self.last_ts = last if self.last_ts is None else max(self.last_ts, last)
+
+        for ts, label, value in compress(zip(timestamps, labels, correct),
+                                         map(ne, labels, correct)):
+            self.mistake_logs.append('{}{}'.format(ts, Fizzer.LABELS[label]))
+            self.mistake_counts[value] += 1
+
+        fizzbuzz = compress(timestamps, map(eq, correct, [FIZZBUZZ] * len(correct)))
+        for ts in fizzbuzz:
+            self.fizzbuzz_weekdays[self.weekday(ts)] += 1
+
+        return self
+
+    def weekday(self, ts):
+        """Local weekday (Monday is 0) computed from epoch seconds. The local UTC
+        offset is looked up once per quarter hour, the finest granularity at
+        which it changes.
+        """
+        bucket = ts // self.OFFSET_BUCKET_SECONDS
+        offset = self.utc_offsets.get(bucket)
+        if offset is None:
+            offset = time.localtime(bucket * self.OFFSET_BUCKET_SECONDS).tm_gmtoff
+            self.utc_offsets[bucket] = offset
+        return ((ts + offset) // 86400 + EPOCH_WEEKDAY) % 7
+
+    #
+    # Properties
+    #
+    @property
+    def start_date(self):
+        return datetime.fromtimestamp(self.first_ts)
+
+    @property
+    def end_date(self):
+        return datetime.fromtimestamp(self.last_ts)
+
+    @property
+    def mistakes(self):
+        return sorted(self.mistake_logs)
+
+    def value_by_day_of_week(self):
+        return {calendar.day_name[day]: count
+                for day, count in enumerate(self.fizzbuzz_weekdays) if count}
+
+    def mistakes_by_value(self):
+        return {Fizzer.LABELS[code]: count
+                for code, count in enumerate(self.mistake_counts) if count}
+
+    def report(self):
+        return {
+            'logs': self.count,
+            'when': (self.start_date, self.end_date),
+            'error rate': len(self.mistake_logs) / self.count,
+            'mistakes': self.mistakes,
+            'fizzbuzz by day-of-week': self.value_by_day_of_week(),
+            'mistakes by value': self.mistakes_by_value()
+        }
@@ -0,0 +1,90 @@
+"""
+Streaming reader for base64-encoded fizzbuzz logs.
+
+Decodes the payload in fixed-size chunks from a file, a memory-mapped file, or
+any bytes-like buffer, carrying partial base64 quanta and partial lines across
+chunk boundaries. Memory use is bounded by the chunk size, not the payload.
+
+Usage:
+for timestamp, label in EncodedLogReader.from_file('encoded_log.txt').records():
+    ...
+
+solution = FastSolver.from_file('encoded_log.txt')
+"""
+import binascii
+import mmap
+
+
+class EncodedLogReader:
+    # Multiple of 4 so whole base64 quanta usually line up with chunk edges.
+    CHUNK_SIZE = 1 << 20
+    WHITESPACE = b' \t\r\n'
+
+    @staticmethod
+    def from_file(path, use_mmap=False, chunk_size=None):
+        return EncodedLogReader(path=path, use_mmap=use_mmap, chunk_size=chunk_size)
+
+    @staticmethod
+    def from_buffer(buffer, chunk_size=None):
+        """buffer may be bytes, str, or anything sliceable to bytes (e.g. mmap)."""
+        if isinstance(buffer, str):
+            buffer = buffer.encode('ascii')
+        return EncodedLogReader(buffer=buffer, chunk_size=chunk_size)
+
+    def __init__(self, path=None, buffer=None, use_mmap=False, chunk_size=None):
+        self.path = path
+        self.buffer = buffer
+        self.use_mmap = use_mmap
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    #
+    # Public Methods
+    #
+    def records(self):
+        """Yields (timestamp, label) for each log line."""
+        for line in self.lines():
+            yield int(line[:10]), line[10:].decode('ascii')
+
+    def lines(self):
+        """Yields each decoded log line as bytes."""
+        tail = b''
+        for data in self.decoded_chunks():
+            lines = (tail + data).split(b'\n')
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+
+    def decoded_chunks(self):
+        pending = b''
+        for chunk in self.encoded_chunks():
+            pending += chunk.translate(None, self.WHITESPACE)
+            cut = len(pending) - len(pending) % 4
+            if cut:
+                yield binascii.a2b_base64(pending[:cut])
+                pending = pending[cut:]
+        if pending:
+            yield binascii.a2b_base64(pending)
+
+    #
+    # Private Methods
+    #
+    def encoded_chunks(self):
+        if self.buffer is not None:
+            yield from self.buffer_chunks(self.buffer)
+            return
+
+        with open(self.path, 'rb') as f:
+            if self.use_mmap:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    yield from self.buffer_chunks(buffer)
+            else:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+    def buffer_chunks(self, buffer):
+        for start in range(0, len(buffer), self.chunk_size):
+            yield bytes(buffer[start:start + self.chunk_size])
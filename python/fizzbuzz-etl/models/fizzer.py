@@ -3,6 +3,13 @@ from datetime import datetime
 
 
 class Fizzer:
+    # Indexed by label_code: bit 0 set for multiples of 3, bit 1 for 5.
+    LABELS = ('', 'fizz', 'buzz', 'fizzbuzz')
+
+    @staticmethod
+    def label_code(number):
+        return (number % 3 == 0) | (number % 5 == 0) << 1
+
     @staticmethod
     def is_mistake(log):
         ts = log[:10]
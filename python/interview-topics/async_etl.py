@@ -1,23 +1,43 @@
+"""
+Async ETL demo.
+
+ETL is the original demo: a fixed set of staggered requests gathered before
+transform and load run. Pipeline is the reusable version: extract, transform
+and load run as concurrent stages joined by bounded queues, so results are
+transformed and loaded as soon as they arrive and a slow stage applies
+backpressure upstream. Extraction is capped by a semaphore, each request has
+a timeout, and error responses are retried with backoff.
+
+Usage:
+pipeline = Pipeline(extract, transform, load, concurrency=20)
+stats = asyncio.run(pipeline.run(items))
+
+Run demo: python async_etl.py
+Run tests: python -m unittest async_etl
+"""
 import asyncio
+import inspect
 import random
 import time
+import unittest
 
 
 class Response:
     STATUSES = ['ok', 'error']
 
-    def __init__(self):
+    def __init__(self, rng=random):
+        # rng: a seeded random.Random for reproducible responses.
         self.started_at = time.time()
-        self.delay = random.randint(1, 2000) / 1000
-        self.status = random.choice(self.STATUSES)
+        self.delay = rng.randint(1, 2000) / 1000
+        self.status = rng.choice(self.STATUSES)
 
         if self.status == 'ok':
-            self.data = self.query_data()
+            self.data = self.query_data(rng)
         else:
             self.data = 'error'
 
-    def query_data(self):
-        return random.randint(1, 1000)
+    def query_data(self, rng=random):
+        return rng.randint(1, 1000)
 
     def __repr__(self):
         f = '<Response started={} delay={} status={} data={}>'
@@ -68,6 +88,210 @@ class ETL:
         return sum(data)
 
 
+class PipelineStats:
+    def __init__(self):
+        self.started_at = time.time()
+        self.ended_at = None
+        self.extracted = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.skipped = 0
+        self.loaded = 0
+
+    @property
+    def elapsed(self):
+        return (self.ended_at or time.time()) - self.started_at
+
+    @property
+    def throughput(self):
+        """Items loaded per second."""
+        return self.loaded / self.elapsed if self.elapsed else 0
+
+    def report(self):
+        return {
+            'extracted': self.extracted,
+            'retries': self.retries,
+            'timeouts': self.timeouts,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'loaded': self.loaded,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput
+        }
+
+    def __repr__(self):
+        f = '<PipelineStats loaded={} failed={} elapsed={:.2f}s throughput={:.1f}/s>'
+        return f.format(self.loaded, self.failed, self.elapsed, self.throughput)
+
+
+class Pipeline:
+    """extract(item) must be a coroutine function. transform(response) and
+    load(value) may be plain or coroutine functions. transform returning None
+    skips the item.
+    """
+    DONE = object()
+
+    def __init__(self, extract, transform, load, concurrency=10, queue_size=100,
+                 transformers=1, timeout=5.0, retries=3, backoff=0.1, is_error=None):
+        self.extract = extract
+        self.transform = transform
+        self.load = load
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.transformers = transformers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.is_error = is_error or (lambda response: getattr(response, 'status', None) == 'error')
+        self.stats = None
+
+    async def run(self, items):
+        """items may be a plain or async iterable. Returns PipelineStats."""
+        self.stats = PipelineStats()
+        transform_queue = asyncio.Queue(maxsize=self.queue_size)
+        load_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        transformers = [asyncio.create_task(self.transform_stage(transform_queue, load_queue))
+                        for _ in range(self.transformers)]
+        loader = asyncio.create_task(self.load_stage(load_queue))
+
+        async def extract_and_close():
+            await self.extract_stage(items, transform_queue)
+            for _ in transformers:
+                await transform_queue.put(self.DONE)
+            await asyncio.gather(*transformers)
+            await load_queue.put(self.DONE)
+
+        extractor = asyncio.create_task(extract_and_close())
+        await self.supervise([extractor, loader] + transformers)
+
+        self.stats.ended_at = time.time()
+        return self.stats
+
+    #
+    # Stages
+    #
+    async def extract_stage(self, items, queue):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def fetch(item):
+            try:
+                response = await self.extract_with_retries(item)
+                if response is not None:
+                    # Blocks while downstream is full, holding the semaphore.
+                    await queue.put(response)
+            finally:
+                semaphore.release()
+
+        try:
+            async for item in self.iterate(items):
+                await semaphore.acquire()
+                task = asyncio.create_task(fetch(item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # Only left over when a stage failed and this one was cancelled.
+            for task in list(tasks):
+                task.cancel()
+
+    async def extract_with_retries(self, item):
+        for attempt in range(self.retries + 1):
+            try:
+                response = await asyncio.wait_for(self.extract(item), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                response = None
+
+            if response is not None and not self.is_error(response):
+                self.stats.extracted += 1
+                return response
+
+            if attempt < self.retries:
+                self.stats.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        self.stats.failed += 1
+        return None
+
+    async def transform_stage(self, in_queue, out_queue):
+        while True:
+            response = await in_queue.get()
+            if response is self.DONE:
+                return
+
+            value = await self.call(self.transform, response)
+            if value is None:
+                self.stats.skipped += 1
+            else:
+                await out_queue.put(value)
+
+    async def load_stage(self, queue):
+        while True:
+            value = await queue.get()
+            if value is self.DONE:
+                return
+
+            await self.call(self.load, value)
+            self.stats.loaded += 1
+
+    #
+    # Helpers
+    #
+    @staticmethod
+    async def supervise(tasks):
+        """Waits for every stage. If one raises, the others are cancelled (a stage
+        blocked on a full queue would otherwise wait forever) and the error is
+        raised here.
+        """
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+            failed = [task for task in done if task.exception()]
+            if failed:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise failed[0].exception()
+
+    @staticmethod
+    async def call(fn, *args):
+        result = fn(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    @staticmethod
+    async def iterate(items):
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                yield item
+        else:
+            for item in items:
+                yield item
+
+
+async def pipeline_main(count=30):
+    print('Start Pipeline ETL')
+    etl = ETL()
+    total = []
+
+    async def extract(n):
+        return await etl.request_data()
+
+    def transform(response):
+        return response.data
+
+    pipeline = Pipeline(extract, transform, total.append, concurrency=10, timeout=1.5)
+    stats = await pipeline.run(range(count))
+    print('Pipeline result {}: {}'.format(len(total), sum(total)))
+    print(stats)
+
+
 async def main():
     print('Start ETL')
     started_at = time.time()
@@ -90,4 +314,120 @@ async def main():
     print(result_f.format(async_time, sync_time, savings))
 
 
-asyncio.run(main())
+#
+# Tests
+#
+class PipelineTest(unittest.TestCase):
+    def test_loads_every_ok_response(self):
+        loaded = []
+
+        async def extract(n):
+            await asyncio.sleep(0)
+            return n
+
+        pipeline = Pipeline(extract, lambda n: n * 2, loaded.append, is_error=lambda n: False)
+        stats = asyncio.run(pipeline.run(range(20)))
+
+        self.assertEqual(sorted(loaded), [n * 2 for n in range(20)])
+        self.assertEqual(stats.loaded, 20)
+
+    def test_retries_error_responses(self):
+        attempts = {}
+
+        async def extract(n):
+            attempts[n] = attempts.get(n, 0) + 1
+            return 'error' if attempts[n] < 3 else n
+
+        pipeline = Pipeline(extract, lambda n: n, lambda n: None, retries=2, backoff=0,
+                            is_error=lambda r: r == 'error')
+        stats = asyncio.run(pipeline.run(range(5)))
+
+        self.assertEqual(stats.loaded, 5)
+        self.assertEqual(stats.retries, 10)
+        self.assertEqual(stats.failed, 0)
+
+    def test_times_out_slow_requests(self):
+        async def extract(n):
+            await asyncio.sleep(1 if n == 0 else 0)
+            return n
+
+        pipeline = Pipeline(extract, lambda n: n, lambda n: None, timeout=0.05, retries=1,
+                            backoff=0, is_error=lambda r: False)
+        stats = asyncio.run(pipeline.run(range(3)))
+
+        self.assertEqual(stats.timeouts, 2)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.loaded, 2)
+
+    def test_limits_concurrency(self):
+        active = []
+        peak = []
+
+        async def extract(n):
+            active.append(n)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(n)
+            return n
+
+        pipeline = Pipeline(extract, lambda n: n, lambda n: None, concurrency=3,
+                            is_error=lambda r: False)
+        asyncio.run(pipeline.run(range(12)))
+
+        self.assertEqual(max(peak), 3)
+
+    def test_loads_before_extract_finishes(self):
+        events = []
+
+        async def extract(n):
+            await asyncio.sleep(0.01 * n)
+            events.append(('extract', n))
+            return n
+
+        pipeline = Pipeline(extract, lambda n: n, lambda n: events.append(('load', n)),
+                            concurrency=5, is_error=lambda r: False)
+        asyncio.run(pipeline.run(range(5)))
+
+        self.assertLess(events.index(('load', 0)), events.index(('extract', 4)))
+
+    def test_stage_error_stops_pipeline(self):
+        async def extract(n):
+            await asyncio.sleep(0)
+            return n
+
+        def transform(n):
+            if n == 3:
+                raise ValueError('bad item {}'.format(n))
+            return n
+
+        pipeline = Pipeline(extract, transform, lambda n: None, queue_size=2,
+                            is_error=lambda r: False)
+
+        async def run():
+            return await asyncio.wait_for(pipeline.run(range(50)), 3)
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+    def test_load_error_stops_pipeline(self):
+        def load(n):
+            raise RuntimeError('load failed')
+
+        async def extract(n):
+            return n
+
+        pipeline = Pipeline(extract, lambda n: n, load, queue_size=1, is_error=lambda r: False)
+
+        async def run():
+            return await asyncio.wait_for(pipeline.run(range(50)), 3)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run())
+
+
+#
+# Main
+#
+if __name__ == '__main__':
+    asyncio.run(main())
+    asyncio.run(pipeline_main())
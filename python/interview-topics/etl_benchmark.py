@@ -0,0 +1,239 @@
+"""
+Benchmark of execution models for the async_etl workload.
+
+Runs the same Response-driven workload (wait out the response delay, then do
+a little CPU work transforming it) through four execution models:
+
+- sequential: one task after another
+- threads: ThreadPoolExecutor
+- asyncio: tasks gathered on one event loop
+- processes: ProcessPoolExecutor
+
+across a sweep of task counts and latency distributions, and reports p50/p95/p99
+task latency, throughput, and CPU utilisation (CPU seconds over wall seconds
+times cores) for each.
+
+Delays are multiplied by --scale (default 0.01), so the default uniform 1-2000ms
+Response delay becomes 0.01-20ms and a full sweep finishes in a minute or two.
+
+Usage:
+python etl_benchmark.py
+python etl_benchmark.py --counts 100 1000 --models threads asyncio --json results.json
+
+Run tests: python -m unittest etl_benchmark
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from async_etl import Response
+
+
+# Response delay distributions, in seconds before scaling.
+DISTRIBUTIONS = {
+    'uniform': lambda rng: rng.randint(1, 2000) / 1000,
+    'constant': lambda rng: 1.0,
+    'exponential': lambda rng: min(rng.expovariate(1.0), 10.0),
+    'lognormal': lambda rng: min(rng.lognormvariate(-0.5, 1.0), 10.0),
+}
+
+MODELS = ['sequential', 'threads', 'asyncio', 'processes']
+TASK_COUNTS = [10, 100, 500]
+WORKERS = 32
+PROCESS_WORKERS = os.cpu_count()
+CPU_WORK = 2000
+
+
+#
+# Workload
+#
+def make_workload(count, distribution, scale, seed=0):
+    """Returns count Responses with delays drawn from distribution. Everything
+    random about them (delay, status, data) comes from seed.
+    """
+    rng = random.Random(seed)
+    draw = DISTRIBUTIONS[distribution]
+    responses = []
+    for _ in range(count):
+        response = Response(rng)
+        response.delay = draw(rng) * scale
+        responses.append(response)
+    return responses
+
+
+def transform(response, work=CPU_WORK):
+    # Stand-in for parsing/validating a payload.
+    return sum(n * n for n in range(work)) + (response.data if response.status == 'ok' else 0)
+
+
+def run_task(response, work=CPU_WORK):
+    """Blocking task. Returns (started, ended) wall times."""
+    started = time.time()
+    time.sleep(response.delay)
+    transform(response, work)
+    return started, time.time()
+
+
+async def run_async_task(response, work=CPU_WORK):
+    started = time.time()
+    await asyncio.sleep(response.delay)
+    transform(response, work)
+    return started, time.time()
+
+
+#
+# Execution Models
+#
+def run_sequential(responses, work):
+    return [run_task(response, work) for response in responses]
+
+
+def run_threads(responses, work):
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        return list(executor.map(run_task, responses, [work] * len(responses)))
+
+
+def run_asyncio(responses, work):
+    async def gather():
+        return await asyncio.gather(*[run_async_task(r, work) for r in responses])
+    return asyncio.run(gather())
+
+
+def run_processes(responses, work):
+    with ProcessPoolExecutor(max_workers=PROCESS_WORKERS) as executor:
+        return list(executor.map(run_task, responses, [work] * len(responses)))
+
+
+RUNNERS = {
+    'sequential': run_sequential,
+    'threads': run_threads,
+    'asyncio': run_asyncio,
+    'processes': run_processes,
+}
+
+
+#
+# Measurement
+#
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def cpu_seconds():
+    """CPU time of this process plus any reaped child processes."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def benchmark(model, count, distribution, scale=0.01, work=CPU_WORK):
+    responses = make_workload(count, distribution, scale)
+    cpu_start = cpu_seconds()
+    wall_start = time.time()
+
+    timings = RUNNERS[model](responses, work)
+
+    wall = time.time() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    # Latency from when the run began, so queueing time counts against a model.
+    latencies = [ended - wall_start for _, ended in timings]
+
+    return {
+        'model': model,
+        'tasks': count,
+        'distribution': distribution,
+        'wall': wall,
+        'throughput': count / wall if wall else None,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'cpu': cpu,
+        'cpu utilisation': cpu / (wall * os.cpu_count()) if wall else None,
+        'summed delay': sum(r.delay for r in responses),
+    }
+
+
+def sweep(models=MODELS, counts=TASK_COUNTS, distributions=DISTRIBUTIONS, scale=0.01,
+          work=CPU_WORK):
+    results = []
+    for distribution in distributions:
+        for count in counts:
+            for model in models:
+                result = benchmark(model, count, distribution, scale, work)
+                print(format_result(result))
+                results.append(result)
+    return results
+
+
+def format_result(result):
+    f = ('{distribution:>11} {tasks:>6} {model:>10}  wall {wall:7.3f}s  '
+         '{throughput:9.1f}/s  p50 {p50:7.3f}  p95 {p95:7.3f}  p99 {p99:7.3f}  '
+         'cpu {cpu_utilisation:6.1%}')
+    return f.format(**{key.replace(' ', '_'): value for key, value in result.items()})
+
+
+#
+# Tests
+#
+class BenchmarkTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_workload_is_reproducible(self):
+        def fields(responses):
+            return [(r.delay, r.status, r.data) for r in responses]
+
+        workload = fields(make_workload(20, 'lognormal', 0.01, seed=3))
+        self.assertEqual(workload, fields(make_workload(20, 'lognormal', 0.01, seed=3)))
+        self.assertNotEqual(workload, fields(make_workload(20, 'lognormal', 0.01, seed=4)))
+
+    def test_every_model_completes_every_task(self):
+        for model in MODELS:
+            result = benchmark(model, 8, 'uniform', scale=0.001, work=10)
+            self.assertEqual(result['tasks'], 8)
+            self.assertLessEqual(result['p50'], result['p99'])
+            self.assertGreater(result['throughput'], 0)
+
+    def test_concurrency_beats_sequential_on_io(self):
+        sequential = benchmark('sequential', 20, 'constant', scale=0.01, work=10)
+        threaded = benchmark('threads', 20, 'constant', scale=0.01, work=10)
+        self.assertLess(threaded['wall'], sequential['wall'])
+
+
+#
+# Main
+#
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ETL execution models.')
+    parser.add_argument('--models', nargs='+', default=MODELS, choices=MODELS)
+    parser.add_argument('--counts', nargs='+', type=int, default=TASK_COUNTS)
+    parser.add_argument('--distributions', nargs='+', default=list(DISTRIBUTIONS),
+                        choices=list(DISTRIBUTIONS))
+    parser.add_argument('--scale', type=float, default=0.01)
+    parser.add_argument('--work', type=int, default=CPU_WORK)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = sweep(args.models, args.counts, args.distributions, args.scale, args.work)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('Wrote {} results to {}'.format(len(results), args.json))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+FakeGraph
+
+A local stand-in for the parts of the Microsoft Graph API the services use, so
+fetches, syncs and exports can be run without an Office 365 account:
+
+- /me/mailFolders/{folder}/messages
+- /me/calendar/events (series masters, not occurrences)
+- /me/calendar/calendarView and /me/events/{id}/instances (occurrences)
+- /me/messages/{id}, /me/events/{id} and /me/calendars, /me/calendar
+
+It understands the $filter expressions O365 builds on date fields ("x ge
+...", "and"-ed together), $select, $top and paging by @odata.nextLink. Every
+request is recorded in server.requests.
+
+Usage:
+server = FakeGraphServer(messages={'Inbox': [message(...)]}, events=[event(...)])
+server.start()
+service = BusinessActivityService(None, None, account=server.account())
+server.stop()
+"""
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from O365 import Account
+from O365.utils import BaseTokenBackend
+from services.business_activity_service import BusinessActivityService
+
+
+CALENDAR_ID = 'calendar-1'
+FILTER_TERM = re.compile(r"([\w/]+) (eq|ne|gt|ge|lt|le) '?([^' ]+)'?")
+OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'ne': lambda a, b: a != b,
+    'gt': lambda a, b: a > b,
+    'ge': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'le': lambda a, b: a <= b
+}
+
+
+#
+# Graph Resources
+#
+def message(id, sent_at, subject='', sender='sender@example.com', modified_at=None):
+    return {
+        'id': id,
+        'subject': subject or 'Message {}'.format(id),
+        'sender': {'emailAddress': {'address': sender, 'name': sender}},
+        'sentDateTime': graph_datetime(sent_at),
+        'receivedDateTime': graph_datetime(sent_at),
+        'createdDateTime': graph_datetime(sent_at),
+        'lastModifiedDateTime': graph_datetime(modified_at or sent_at),
+        'webLink': 'https://outlook.example.com/{}'.format(id),
+        'bodyPreview': 'Preview of {}'.format(id),
+        'body': {'contentType': 'text', 'content': 'Body of {}'.format(id)}
+    }
+
+
+def event(id, start, end, subject='', organizer='organizer@example.com', modified_at=None,
+          type='singleInstance', series_master_id=None):
+    return {
+        'id': id,
+        'subject': subject or 'Event {}'.format(id),
+        'organizer': {'emailAddress': {'address': organizer, 'name': organizer}},
+        'start': {'dateTime': start.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+                  'timeZone': 'UTC'},
+        'end': {'dateTime': end.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S'),
+                'timeZone': 'UTC'},
+        'createdDateTime': graph_datetime(modified_at or start),
+        'lastModifiedDateTime': graph_datetime(modified_at or start),
+        'type': type,
+        'seriesMasterId': series_master_id,
+        'body': {'contentType': 'html', 'content': '<p>Agenda for {}</p>'.format(id)}
+    }
+
+
+def series(id, first_start, duration, count, days_apart=7, subject='', modified_at=None):
+    """Returns (master, occurrences) for a weekly (by default) recurring meeting."""
+    master = event(id, first_start, first_start + duration, subject=subject,
+                   modified_at=modified_at, type='seriesMaster')
+    occurrences = []
+    for n in range(count):
+        start = first_start + timedelta(days=days_apart * n)
+        occurrences.append(event('{}-{}'.format(id, n), start, start + duration,
+                                 subject=master['subject'], modified_at=modified_at,
+                                 type='occurrence', series_master_id=id))
+    return master, occurrences
+
+
+def graph_datetime(value):
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_datetime(value):
+    # Graph accepts dates, naive datetimes (UTC) and offsets; fromisoformat
+    # before 3.11 doesn't know "Z" or 7-digit fractions.
+    value = value.replace('Z', '+00:00')
+    value = re.sub(r'(\.\d{6})\d+', r'\1', value)
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def field_value(resource, field):
+    value = resource
+    for step in field.split('/'):
+        value = value.get(step) if isinstance(value, dict) else None
+    if isinstance(value, str) and re.match(r'\d{4}-\d\d-\d\d', value):
+        return parse_datetime(value)
+    return value
+
+
+def event_range(resource):
+    return field_value(resource, 'start/dateTime'), field_value(resource, 'end/dateTime')
+
+
+#
+# Server
+#
+class FakeGraphServer:
+    def __init__(self, messages=None, events=None, page_size=None):
+        """messages maps folder id (Inbox, SentItems) to message resources.
+        events holds single meetings, series masters and occurrences.
+        page_size caps every page, whatever $top asks for.
+        """
+        self.messages = messages or {}
+        self.events = events or []
+        self.page_size = page_size
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/'.format(self.httpd.server_address[1])
+
+    def start(self):
+        handler = type('Handler', (FakeGraphHandler,), {'graph': self})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def account(self):
+        """An O365 Account for this server, already holding a token."""
+        # The token is sent over plain http to localhost.
+        os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+        protocol = BusinessActivityService.graph_protocol(self.url)
+        # No need for O365's default 200ms pause between requests against a local server.
+        return Account(('fake-client', 'fake-secret'), protocol=protocol,
+                       token_backend=MemoryTokenBackend(), requests_delay=0)
+
+    def add(self, *resources):
+        with self.lock:
+            self.events.extend(resources)
+
+    def replace(self, resource):
+        with self.lock:
+            self.events = [r for r in self.events if r['id'] != resource['id']] + [resource]
+
+    def paths(self, prefix=''):
+        return [path for path, _ in self.requests if path.startswith(prefix)]
+
+    #
+    # Routes
+    #
+    def route(self, path, params):
+        with self.lock:
+            self.requests.append((path, params))
+
+        parts = path.strip('/').split('/')[2:]     # after v1.0/me
+        # The default calendar is also reachable by id once it's been read.
+        if parts[:2] == ['calendars', CALENDAR_ID]:
+            parts = ['calendar'] + parts[2:]
+
+        if parts == ['calendar']:
+            return {'id': CALENDAR_ID, 'name': 'Calendar'}
+        if parts[0] == 'mailFolders' and parts[2:] == ['messages']:
+            return self.page(self.messages.get(parts[1], []), params)
+        if parts == ['calendar', 'events']:
+            items = [e for e in self.events if e['type'] != 'occurrence']
+            return self.page(items, params)
+        if parts == ['calendar', 'calendarView']:
+            items = [e for e in self.events if e['type'] != 'seriesMaster']
+            return self.page(self.overlapping(items, params), params)
+        if parts[0] == 'events' and parts[2:] == ['instances']:
+            items = [e for e in self.events if e.get('seriesMasterId') == parts[1]]
+            return self.page(self.overlapping(items, params), params)
+        if parts[0] == 'events' and len(parts) == 2 or parts[:2] == ['calendar', 'events']:
+            found = [e for e in self.events if e['id'] == parts[-1]]
+            return self.select(found[0], params) if found else None
+        if parts[0] == 'messages' and len(parts) == 2:
+            found = [m for folder in self.messages.values() for m in folder if m['id'] == parts[1]]
+            return self.select(found[0], params) if found else None
+        return None
+
+    def page(self, items, params):
+        items = [item for item in items if self.matches(item, params.get('$filter'))]
+        items.sort(key=lambda item: item['id'])
+
+        top = int(params.get('$top', 10))
+        if self.page_size:
+            top = min(top, self.page_size)
+        skip = int(params.get('$skip', 0))
+
+        data = {'value': [self.select(item, params) for item in items[skip:skip + top]]}
+        if skip + top < len(items):
+            data['@odata.nextLink'] = '{}?{}'.format(
+                params['_url'], urlencode(dict(params.get('_query'), **{'$skip': skip + top})))
+        return data
+
+    @staticmethod
+    def matches(item, filter):
+        if not filter:
+            return True
+        for term in filter.split(' and '):
+            field, op, value = FILTER_TERM.match(term.strip()).groups()
+            actual = field_value(item, field)
+            if actual is None or not OPERATORS[op](actual, parse_datetime(value)):
+                return False
+        return True
+
+    @staticmethod
+    def overlapping(items, params):
+        start = parse_datetime(params['startDateTime'])
+        end = parse_datetime(params['endDateTime'])
+        return [item for item in items
+                if event_range(item)[0] < end and event_range(item)[1] > start]
+
+    @staticmethod
+    def select(item, params):
+        fields = params.get('$select')
+        if not fields:
+            return item
+        fields = set(fields.split(',')) | {'id'}
+        return {key: value for key, value in item.items() if key in fields}
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    graph = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        params = dict(query, _url=self.graph.url.rstrip('/') + url.path, _query=query)
+
+        data = self.graph.route(url.path, params)
+        body = json.dumps(data if data is not None else {'error': {'code': 'NotFound'}})
+        self.send_response(200 if data is not None else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MemoryTokenBackend(BaseTokenBackend):
+    def load_token(self):
+        return self.token_constructor({
+            'token_type': 'Bearer',
+            'access_token': 'fake-token',
+            'refresh_token': 'fake-refresh',
+            'expires_in': 3600,
+            'expires_at': time.time() + 3600,
+            'scope': ['Calendars.Read', 'Mail.Read']
+        })
+
+    def save_token(self):
+        return True
@@ -1,6 +1,8 @@
 from datetime import date, timedelta
 import csv
 from secrets import CLIENT_ID, SECRET_ID
+from services.activity_cache import ActivityCache
+from services.batch_exporter import BatchExporter
 from services.business_activity_service import BusinessActivityService
 
 
@@ -9,12 +11,31 @@ from services.business_activity_service import BusinessActivityService
 #
 def main():
     service = BusinessActivityService(CLIENT_ID, SECRET_ID)
-    activities = service.fetch_activities()
+    activities = service.fetch_activities_concurrently()
     csv_path = write_to_csv(activities)
     print('Wrote {} activities to {}'.format(len(activities), csv_path))
     breakpoint()
 
 
+def sync():
+    """Exports from the local cache, fetching only what changed since last run."""
+    service = BusinessActivityService(CLIENT_ID, SECRET_ID)
+    cache = ActivityCache()
+    activities = service.sync_activities(cache)
+    csv_path = write_to_csv(activities)
+    print('Wrote {} activities to {}'.format(len(activities), csv_path))
+    cache.close()
+
+
+def batch(accounts_path='accounts.csv', combined=True):
+    """Exports every account listed in accounts_path (name,client_id,secret_id)."""
+    accounts = BatchExporter.load_accounts(accounts_path)
+    exporter = BatchExporter(accounts, out_dir='exports', combined=combined)
+    results = exporter.export()
+    for name, result in results.items():
+        print('{}: {}'.format(name, result))
+
+
 def activities():
     service = BusinessActivityService(CLIENT_ID, SECRET_ID)
     activities = service.fetch_activities()
@@ -1,46 +1,98 @@
+from functools import partial
+from bs4 import BeautifulSoup as bs
+
+
+NOT_LOADED = object()
+
+
 class BusinessActivity:
+    # Slotted to keep per-record overhead down on large exports. description and
+    # data may be given as loaders (callables) that run on first access. A
+    # loader must not hold the fetched Message or Event, or that object (body,
+    # connection and all) stays alive as long as the activity.
+    __slots__ = ('id', 'resource', 'owner', 'started_at', 'ended_at', 'created_at',
+                 'modified_at', 'title', 'url', '_description', '_data',
+                 '_description_loader', '_data_loader')
+
     def __init__(self, **params):
+        self.id = params.get('id')
         self.resource = params.get('resource')
         self.owner = params.get('owner')
         self.started_at = params.get('started_at')
-        self.ended_at = params.get('started_at')
+        self.ended_at = params.get('ended_at')
         self.created_at = params.get('created_at')
+        self.modified_at = params.get('modified_at')
         self.title = params.get('title')
-        self.description = params.get('description')
         self.url = params.get('url')
-        self.data = params.get('data')
+        self._description = params.get('description', NOT_LOADED)
+        self._data = params.get('data', NOT_LOADED)
+        self._description_loader = params.get('description_loader')
+        self._data_loader = params.get('data_loader')
 
     #
     # Static Methods
     #
     @staticmethod
-    def from_email_message(message):
+    def from_email_message(message, data_loader=None):
+        """data_loader reads the raw API data later (by id), for messages
+        fetched with only the fields CSV exports use.
+        """
+        data = {'data_loader': data_loader} if data_loader else {'data': message.to_api_data()}
+
         return BusinessActivity(
+            id=message.object_id,
             resource='email',
             owner=message.sender.address,
             started_at=message.sent,
             ended_at=message.received,
             created_at=message.created,
+            modified_at=message.modified,
             title=message.subject,
             description=message.body_preview,
             url=message.web_link,
-            data=message.to_api_data()
+            **data
         )
 
     @staticmethod
-    def from_calendar_event(event):
+    def from_calendar_event(event, lazy_body=False, data_loader=None):
+        """lazy_body keeps the event's raw body and only parses it into text
+        when the description is first read. data_loader is as for
+        from_email_message.
+        """
+        if lazy_body:
+            description = {'description_loader': partial(
+                BusinessActivity.body_text, event.body, event.body_type)}
+        else:
+            description = {'description': event.get_body_text()}
+        data = {'data_loader': data_loader} if data_loader else {'data': event.to_api_data()}
+
         return BusinessActivity(
+            id=event.object_id,
             resource='meeting',
             owner=event.organizer.address,
             started_at=event.start,
             ended_at=event.end,
             created_at=event.created,
+            modified_at=event.modified,
             title=event.subject,
-            description=event.get_body_text(),
             url=None,
-            data=event.to_api_data()
+            **description,
+            **data
         )
 
+    @staticmethod
+    def body_text(body, body_type):
+        """Event.get_body_text, for a body kept without its Event."""
+        if body_type != 'HTML':
+            return body
+
+        try:
+            soup = bs(body, 'html.parser')
+        except RuntimeError:
+            return body
+        else:
+            return soup.body.text
+
     #
     # Properties
     #
@@ -48,9 +100,36 @@ class BusinessActivity:
     def date(self):
         return self.started_at.date()
 
+    @property
+    def description(self):
+        if self._description is NOT_LOADED:
+            self._description = self.load('description')
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        self._description = value
+
+    @property
+    def data(self):
+        if self._data is NOT_LOADED:
+            self._data = self.load('data')
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
     #
     # Instance Methods
     #
+    def load(self, name):
+        # Loaders are dropped once used so the source object can be freed.
+        attr = '_{}_loader'.format(name)
+        loader = getattr(self, attr)
+        setattr(self, attr, None)
+        return loader() if loader else None
+
     def to_csv(self):
         return [
             self.date,
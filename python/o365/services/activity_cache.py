@@ -0,0 +1,137 @@
+"""
+ActivityCache
+
+A local SQLite cache of BusinessActivity records keyed by their message or event
+id, plus the watermark of the last sync and the date range the cache covers.
+BusinessActivityService.sync_activities uses it to fetch only items created or
+modified since the last run.
+"""
+import sqlite3
+from datetime import date, datetime, timezone
+from models.business_activity import BusinessActivity
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id TEXT PRIMARY KEY,
+    resource TEXT,
+    owner TEXT,
+    started_at TEXT,
+    ended_at TEXT,
+    created_at TEXT,
+    modified_at TEXT,
+    title TEXT,
+    description TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS activities_started_at ON activities (started_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ['id', 'resource', 'owner', 'started_at', 'ended_at', 'created_at', 'modified_at',
+           'title', 'description', 'url']
+DATETIME_COLUMNS = ['started_at', 'ended_at', 'created_at', 'modified_at']
+
+
+class ActivityCache:
+    def __init__(self, path='o365-activities.db'):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    #
+    # Sync Watermark
+    #
+    @property
+    def watermark(self):
+        row = self.db.execute("SELECT value FROM sync_state WHERE key = 'watermark'").fetchone()
+        return self.load_datetime(row[0]) if row else None
+
+    @watermark.setter
+    def watermark(self, synced_at):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('watermark', ?)",
+                (self.dump_datetime(synced_at),))
+
+    @property
+    def synced_range(self):
+        """(start date, end date) fully fetched into the cache, or None."""
+        rows = dict(self.db.execute(
+            "SELECT key, value FROM sync_state WHERE key IN ('range_start', 'range_end')"))
+        if len(rows) < 2:
+            return None
+        return self.load_date(rows['range_start']), self.load_date(rows['range_end'])
+
+    @synced_range.setter
+    def synced_range(self, date_range):
+        start_date, end_date = date_range
+        with self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+                [('range_start', start_date.isoformat()), ('range_end', end_date.isoformat())])
+
+    #
+    # Activities
+    #
+    def upsert(self, activities):
+        rows = [self.to_row(activity) for activity in activities]
+        sql = 'INSERT OR REPLACE INTO activities ({}) VALUES ({})'.format(
+            ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+
+        with self.db:
+            self.db.executemany(sql, rows)
+        return len(rows)
+
+    def activities_between(self, start_date, end_date):
+        sql = 'SELECT {} FROM activities WHERE started_at >= ? AND started_at <= ? ' \
+              'ORDER BY started_at'.format(', '.join(COLUMNS))
+        start = self.dump_datetime(self.to_datetime(start_date))
+        end = self.dump_datetime(self.to_datetime(end_date))
+        return [self.from_row(row) for row in self.db.execute(sql, (start, end))]
+
+    def close(self):
+        self.db.close()
+
+    #
+    # Private Methods
+    #
+    def to_row(self, activity):
+        values = []
+        for column in COLUMNS:
+            value = getattr(activity, column)
+            values.append(self.dump_datetime(value) if column in DATETIME_COLUMNS else value)
+        return values
+
+    def from_row(self, row):
+        params = dict(zip(COLUMNS, row))
+        for column in DATETIME_COLUMNS:
+            params[column] = self.load_datetime(params[column])
+        return BusinessActivity(**params)
+
+    @staticmethod
+    def to_datetime(value):
+        # Dates mean midnight UTC, as they do in the Graph queries that filled the cache.
+        if isinstance(value, datetime):
+            return value
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+    @staticmethod
+    def dump_datetime(value):
+        # Stored in UTC so that string order is time order.
+        if value is None:
+            return None
+        return value.astimezone(timezone.utc).isoformat()
+
+    @staticmethod
+    def load_date(value):
+        return datetime.fromisoformat(value) if 'T' in value else date.fromisoformat(value)
+
+    @staticmethod
+    def load_datetime(value):
+        if value is None:
+            return None
+        return datetime.fromisoformat(value).astimezone()
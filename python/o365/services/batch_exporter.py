@@ -0,0 +1,222 @@
+"""
+BatchExporter
+
+Exports business activities for many accounts at once. Accounts are
+authenticated one at a time up front (authentication may prompt), then fetched
+in a worker pool; every account's HTTP session is mounted on one shared
+connection pool and throttled by its own rate limiter. Rows are written as each
+source and date window arrives, to one file per account or a single combined
+file, as CSV or (with pyarrow installed) Parquet.
+
+Accounts file (CSV with header): name,client_id,secret_id
+"""
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from services.business_activity_service import BusinessActivityService
+
+
+CSV_HEADER = ['Date', 'Type', 'Start', 'End', 'Title', 'Owner', 'Description']
+MAX_WORKERS = 8
+ACCOUNT_WORKERS = 3
+POOL_SIZE = 32
+REQUESTS_PER_SECOND = 4
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second, with bursts of burst."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """Sends through a shared urllib3 pool, waiting on the account's limiter.
+    max_retries should carry over the retry policy of the adapter it replaces.
+    """
+    def __init__(self, limiter, shared_adapter, max_retries=0):
+        super().__init__(max_retries=max_retries)
+        self.limiter = limiter
+        self.poolmanager = shared_adapter.poolmanager
+
+    def send(self, request, **kwargs):
+        self.limiter.wait()
+        return super().send(request, **kwargs)
+
+    def close(self):
+        # The pool belongs to the exporter, which closes it once at the end.
+        pass
+
+
+class BatchExporter:
+    @staticmethod
+    def load_accounts(path):
+        with open(path, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def __init__(self, accounts, out_dir='.', combined=False, format='csv',
+                 max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+        self.accounts = accounts
+        self.out_dir = out_dir
+        self.combined = combined
+        self.format = format
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.shared_adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.write_lock = threading.Lock()
+        self.writers = {}
+
+    #
+    # Public Methods
+    #
+    def export(self, start_date=None, end_date=None):
+        """Returns {account name: activity count, or the exception raised}. Rows
+        already written for an account that fails part way are kept.
+        """
+        results = {}
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        # Authentication may be interactive, so it happens here rather than in workers.
+        services = {}
+        for account in self.accounts:
+            try:
+                services[account['name']] = self.connect(account)
+            except Exception as e:
+                print('Authentication failed for {}: {}'.format(account['name'], e))
+                results[account['name']] = e
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self.export_account, name, service, start_date, end_date):
+                        name for name, service in services.items()}
+
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print('Export failed for {}: {}'.format(name, e))
+                        results[name] = e
+        finally:
+            self.close()
+
+        return results
+
+    def connect(self, account):
+        service = BusinessActivityService(
+            account['client_id'], account['secret_id'],
+            token_filename='o365_token_{}.txt'.format(account['name']), slim=True)
+        if not service.account.is_authenticated:
+            raise ValueError('account is not authenticated')
+        self.mount(service.account)
+        return service
+
+    def export_account(self, name, service, start_date, end_date):
+        count = 0
+        for activities in service.stream_activities(start_date, end_date,
+                                                    max_workers=ACCOUNT_WORKERS):
+            self.write(name, activities)
+            count += len(activities)
+        return count
+
+    def mount(self, account):
+        connection = account.con
+        if connection.session is None:
+            connection.session = connection.get_session(load_token=True)
+
+        limiter = RateLimiter(self.requests_per_second)
+        for prefix in ('https://', 'http://'):
+            # Keep O365's retries on 429s and 5xx responses.
+            retries = connection.session.get_adapter(prefix).max_retries
+            adapter = ThrottledAdapter(limiter, self.shared_adapter, max_retries=retries)
+            connection.session.mount(prefix, adapter)
+
+    #
+    # Writers
+    #
+    def write(self, name, activities):
+        rows = [activity.to_csv() for activity in activities]
+        key = 'all' if self.combined else name
+
+        if self.combined:
+            rows = [[name] + row for row in rows]
+
+        with self.write_lock:
+            writer = self.writers.get(key)
+            if writer is None:
+                writer = self.writers[key] = self.open_writer(key)
+            writer.write(rows)
+
+    def open_writer(self, key):
+        header = (['Account'] if self.combined else []) + CSV_HEADER
+        path = os.path.join(self.out_dir, 'o365-activities-{}.{}'.format(key, self.format))
+
+        if self.format == 'parquet':
+            return ParquetRowWriter(path, header)
+        return CsvRowWriter(path, header)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.shared_adapter.close()
+
+
+class CsvRowWriter:
+    def __init__(self, path, header):
+        self.path = path
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetRowWriter:
+    """Writes each batch of rows as a Parquet row group. Values are stored as
+    strings, as in the CSV export.
+    """
+    def __init__(self, path, header):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet export requires pyarrow: pip install pyarrow')
+
+        self.pa = pyarrow
+        self.header = header
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in header])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = [[None if value is None else str(value) for value in column]
+                   for column in zip(*rows)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
@@ -5,19 +5,51 @@ A class for interfacing with business productivity service API. It is set up ini
 to interface with Microsoft Office 365 API. But conceivably in the future it could
 be updated to also interface or even be replaced by Google Workspace.
 """
-from O365 import Account, MSGraphProtocol
-from datetime import date, timedelta
+import random
+import time
+from O365 import Account, FileSystemTokenBackend, MSGraphProtocol
+from O365.calendar import EventType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from itertools import chain
+from requests.exceptions import ConnectionError, HTTPError, Timeout
 from models.business_activity import BusinessActivity
 
 
 SCOPES = ['Calendars.Read', 'Mail.Read']
 
+# Concurrent fetch settings
+PAGE_SIZE = 100
+MAX_WORKERS = 6
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Graph fields fetched in slim mode: only what BusinessActivity and the CSV use.
+# Meetings keep their body, since the CSV description needs it (O365 events
+# don't read bodyPreview), but it's only parsed if the description is used.
+MESSAGE_FIELDS = ['id', 'subject', 'sender', 'sentDateTime', 'receivedDateTime',
+                  'createdDateTime', 'lastModifiedDateTime', 'webLink', 'bodyPreview']
+EVENT_FIELDS = ['id', 'subject', 'organizer', 'start', 'end', 'createdDateTime',
+                'lastModifiedDateTime', 'type', 'seriesMasterId', 'body']
+
 
 class BusinessActivityService:
-    def __init__(self, client_id, secret_id):
+    def __init__(self, client_id, secret_id, account=None, graph_url=None,
+                 token_filename=None, slim=False):
+        """account may be passed in pre-authenticated (e.g. in tests). graph_url
+        points the default account at another Graph endpoint, such as a local
+        fake server. token_filename keeps each account's token in its own file
+        when several accounts are used from one directory. slim limits Graph
+        queries to the fields the CSV export needs.
+        """
         self.client_id = client_id
         self.secret_id = secret_id
-        self.account = self.authenticate()
+        self.graph_url = graph_url
+        self.token_filename = token_filename
+        self.slim = slim
+        self.account = account if account else self.authenticate()
 
     #
     # Properties
@@ -45,13 +77,237 @@ class BusinessActivityService:
         emails = self.fetch_emails(start_date, end_date)
         meetings = self.fetch_meetings(start_date, end_date)
 
-        meeting_activities = [
-            BusinessActivity.from_calendar_event(meeting) for meeting in meetings]
-        email_activities = [BusinessActivity.from_email_message(email) for email in emails]
+        meeting_activities = [self.meeting_activity(meeting) for meeting in meetings]
+        email_activities = [self.email_activity(email) for email in emails]
 
         activities = meeting_activities + email_activities
         return sorted(activities, key=lambda a: a.started_at)
 
+    def fetch_activities_concurrently(self, start_date=None, end_date=None, window_days=1,
+                                      max_workers=MAX_WORKERS):
+        """Like fetch_activities, but without the 500 item cap and in parallel.
+        See stream_activities.
+        """
+        batches = self.stream_activities(start_date, end_date, window_days, max_workers)
+        return sorted(chain.from_iterable(batches), key=lambda a: a.started_at)
+
+    def stream_activities(self, start_date=None, end_date=None, window_days=1,
+                          max_workers=MAX_WORKERS):
+        """Yields lists of activities, one per (source, window) fetch, in the
+        order the fetches finish.
+
+        The date range is split into windows of window_days, and each
+        (source, window) pair is fetched in a thread pool of max_workers,
+        streaming every page of results. Failed fetches are retried with
+        exponential backoff. Messages and meetings each belong to the window
+        they start in (half-open, except the last), so nothing is fetched
+        twice or missed at a window edge.
+        """
+        if not end_date:
+            end_date = date.today()
+
+        if not start_date:
+            start_date = end_date - timedelta(days=7)
+
+        jobs = []
+        for start, end, is_last in self.date_windows(start_date, end_date, window_days):
+            jobs.append((self.fetch_folder_messages, 'inbox_folder', start, end, is_last))
+            jobs.append((self.fetch_folder_messages, 'sent_folder', start, end, is_last))
+            jobs.append((self.fetch_calendar_events, start, end, is_last))
+
+        # Only ids are kept across batches; each batch is released once yielded
+        # (as_completed drops its references to finished futures).
+        seen = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = as_completed([executor.submit(self.fetch_window_activities, *job)
+                                    for job in jobs])
+            for future in futures:
+                activities = [a for a in future.result() if a.id not in seen]
+                seen.update(a.id for a in activities)
+                yield activities
+
+    def fetch_window_activities(self, fetch, *args):
+        items = self.with_retries(fetch, *args)
+        if fetch == self.fetch_calendar_events:
+            return [self.meeting_activity(item) for item in items]
+        return [self.email_activity(item) for item in items]
+
+    def email_activity(self, message):
+        if not self.slim:
+            return BusinessActivity.from_email_message(message)
+        return BusinessActivity.from_email_message(
+            message, data_loader=partial(self.fetch_data, 'messages', message.object_id))
+
+    def meeting_activity(self, event):
+        if not self.slim:
+            return BusinessActivity.from_calendar_event(event)
+        return BusinessActivity.from_calendar_event(
+            event, lazy_body=True,
+            data_loader=partial(self.fetch_data, 'events', event.object_id))
+
+    def fetch_data(self, resource, object_id):
+        """Reads one message's or event's Graph resource (resource is 'messages'
+        or 'events'), for the raw data of items fetched in slim mode.
+        """
+        mailbox = self.mailbox
+        url = mailbox.build_url('/{}/{}'.format(resource, object_id))
+        response = self.with_retries(mailbox.con.get, url)
+        return response.json() if response else None
+
+    def sync_activities(self, cache, start_date=None, end_date=None):
+        """Returns activities for the date range from an ActivityCache, first
+        bringing the cache up to date. The cache records the range it covers.
+        Any part of the requested range outside it is fetched in full, and the
+        covered range grows to include the request (gaps included, so it stays
+        one range). Within the covered range, later syncs fetch only items
+        created or modified since the previous sync's watermark. Deleted items
+        are not removed from the cache.
+        """
+        if not end_date:
+            end_date = date.today()
+
+        if not start_date:
+            start_date = end_date - timedelta(days=7)
+
+        synced_at = datetime.now(timezone.utc)
+        watermark = cache.watermark
+        synced_range = cache.synced_range if watermark else None
+
+        if synced_range is None:
+            cache.upsert(self.fetch_activities_concurrently(start_date, end_date))
+            synced_range = (start_date, end_date)
+        else:
+            synced_start, synced_end = synced_range
+            if start_date < synced_start:
+                cache.upsert(self.fetch_activities_concurrently(start_date, synced_start))
+            if end_date > synced_end:
+                cache.upsert(self.fetch_activities_concurrently(synced_end, end_date))
+            synced_range = (min(start_date, synced_start), max(end_date, synced_end))
+            cache.upsert(self.fetch_changes_since(watermark, *synced_range))
+
+        cache.synced_range = synced_range
+        cache.watermark = synced_at
+        return cache.activities_between(start_date, end_date)
+
+    def fetch_changes_since(self, watermark, start_date, end_date, max_workers=MAX_WORKERS):
+        """Activities created or modified at or after watermark. Changed
+        recurring meetings are expanded into their occurrences in the date range.
+        """
+        jobs = [
+            (self.fetch_modified_messages, 'inbox_folder', watermark, start_date, end_date),
+            (self.fetch_modified_messages, 'sent_folder', watermark, start_date, end_date),
+            (self.fetch_modified_events, watermark, start_date, end_date)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.with_retries, *job) for job in jobs]
+            messages = futures[0].result() + futures[1].result()
+            events = futures[2].result()
+
+        return [self.email_activity(m) for m in messages] + \
+            [self.meeting_activity(e) for e in events]
+
+    def fetch_modified_messages(self, folder_name, watermark, start_date, end_date):
+        folder = getattr(self.mailbox, folder_name)()
+        q = folder.new_query('lastModifiedDateTime').greater_equal(watermark)
+        q.chain('and').on_attribute('sentDateTime').greater_equal(start_date)
+        q.chain('and').on_attribute('sentDateTime').less_equal(end_date)
+        q = self.select(q, MESSAGE_FIELDS)
+        return list(folder.get_messages(query=q, limit=None, batch=PAGE_SIZE))
+
+    def fetch_modified_events(self, watermark, start_date, end_date):
+        # The events list (unlike the calendar view) can filter on modified
+        # time, but returns a changed series as its master alone. Its
+        # occurrences in the synced range replace it.
+        calendar = self.calendar
+        q = calendar.new_query('lastModifiedDateTime').greater_equal(watermark)
+        q = self.select(q, EVENT_FIELDS)
+        changed = calendar.get_events(query=q, include_recurring=False, limit=None,
+                                      batch=PAGE_SIZE)
+
+        events = []
+        for event in changed:
+            if event.event_type == EventType.SeriesMaster:
+                q = self.select(calendar.new_query(), EVENT_FIELDS)
+                events.extend(event.get_occurrences(start_date, end_date, query=q))
+            else:
+                events.append(event)
+        return events
+
+    def fetch_folder_messages(self, folder_name, start_date, end_date, is_last=True):
+        """Fetches every message sent in the window from the named mailbox folder
+        (e.g. 'inbox_folder'). Windows are half-open except the last, so
+        adjacent windows never return the same message.
+        """
+        folder = getattr(self.mailbox, folder_name)()
+        q = folder.new_query('sentDateTime').greater_equal(start_date)
+        q.chain('and').on_attribute('sentDateTime')
+        q = q.less_equal(end_date) if is_last else q.less(end_date)
+        q = self.select(q, MESSAGE_FIELDS)
+        return list(folder.get_messages(query=q, limit=None, batch=PAGE_SIZE))
+
+    def fetch_calendar_events(self, start_date, end_date, is_last=True):
+        """Fetches every meeting (recurring occurrences included) that starts in
+        the window. The calendar view returns everything overlapping the window,
+        so meetings that started in an earlier window are dropped here.
+        """
+        q = self.calendar.new_query('start').greater_equal(start_date)
+        q.chain('and').on_attribute('end').less_equal(end_date)
+        q = self.select(q, EVENT_FIELDS)
+        events = self.calendar.get_events(query=q, include_recurring=True, limit=None,
+                                          batch=PAGE_SIZE)
+        return [event for event in events
+                if self.starts_in_window(event, start_date, end_date, is_last)]
+
+    def select(self, query, fields):
+        return query.select(*fields) if self.slim else query
+
+    def with_retries(self, fetch, *args):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return fetch(*args)
+            except (ConnectionError, HTTPError, Timeout) as e:
+                if attempt == MAX_RETRIES or not self.is_retryable(e):
+                    raise
+                time.sleep(self.backoff_delay(e, attempt))
+
+    def is_retryable(self, error):
+        if isinstance(error, HTTPError):
+            return error.response is not None and error.response.status_code in RETRY_STATUSES
+        return True
+
+    def backoff_delay(self, error, attempt):
+        # Honor the throttling hint Graph sends with 429s.
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, BACKOFF_SECONDS)
+
+    @staticmethod
+    def starts_in_window(event, start_date, end_date, is_last):
+        # Graph reads the dates in queries as midnight UTC, so windows are cut there.
+        def at(value):
+            if isinstance(value, datetime):
+                return value if value.tzinfo else value.replace(tzinfo=event.start.tzinfo)
+            return datetime.combine(value, datetime.min.time(), tzinfo=timezone.utc)
+
+        start, end = at(start_date), at(end_date)
+        return start <= event.start <= end if is_last else start <= event.start < end
+
+    @staticmethod
+    def date_windows(start_date, end_date, days):
+        windows = []
+        window_start = start_date
+        if start_date >= end_date:
+            return [(start_date, end_date, True)]
+
+        while window_start < end_date:
+            window_end = min(window_start + timedelta(days=days), end_date)
+            windows.append((window_start, window_end, window_end == end_date))
+            window_start = window_end
+        return windows
+
     def fetch_emails(self, start_date, end_date):
         """Based on
         https://github.com/O365/python-o365#mailbox
@@ -61,11 +317,13 @@ class BusinessActivityService:
         inbox = self.mailbox.inbox_folder()
         q = inbox.new_query('sentDateTime').greater_equal(start_date)
         q.chain('and').on_attribute('sentDateTime').less_equal(end_date)
+        q = self.select(q, MESSAGE_FIELDS)
         inbox_messages = inbox.get_messages(query=q, limit=500)
 
         sent_folder = self.mailbox.sent_folder()
         q = sent_folder.new_query('sentDateTime').greater_equal(start_date)
         q.chain('and').on_attribute('sentDateTime').less_equal(end_date)
+        q = self.select(q, MESSAGE_FIELDS)
         sent_messages = sent_folder.get_messages(query=q, limit=500)
 
         return list(inbox_messages) + list(sent_messages)
@@ -76,13 +334,28 @@ class BusinessActivityService:
         """
         q = self.calendar.new_query('start').greater_equal(start_date)
         q.chain('and').on_attribute('end').less_equal(end_date)
+        q = self.select(q, EVENT_FIELDS)
         events = self.calendar.get_events(query=q, include_recurring=True, limit=500)
         return list(events)
 
+    @staticmethod
+    def graph_protocol(graph_url=None):
+        protocol = MSGraphProtocol()
+        if graph_url:
+            protocol.protocol_url = graph_url
+            protocol.service_url = '{}{}/'.format(graph_url, protocol.api_version)
+        return protocol
+
     def authenticate(self):
         credentials = (self.client_id, self.secret_id)
-        protocol = MSGraphProtocol()
-        account = Account(credentials, protocol=protocol)
+        protocol = self.graph_protocol(self.graph_url)
+
+        options = {}
+        if self.token_filename:
+            options['token_backend'] = FileSystemTokenBackend(
+                token_path='.', token_filename=self.token_filename)
+
+        account = Account(credentials, protocol=protocol, **options)
 
         if account.is_authenticated:
             print("Token file exists!")
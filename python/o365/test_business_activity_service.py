@@ -0,0 +1,275 @@
+"""
+Tests for BusinessActivityService against a local FakeGraphServer.
+
+Usage:
+python -m unittest test_business_activity_service
+"""
+import csv
+import gc
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from O365.calendar import Event
+from O365.message import Message
+from fake_graph import FakeGraphServer, event, message, series
+from models.business_activity import NOT_LOADED
+from services.activity_cache import ActivityCache
+from services.batch_exporter import BatchExporter, ThrottledAdapter
+from services.business_activity_service import BusinessActivityService
+
+
+def at(day, hour=9, minute=0):
+    return datetime(2024, 3, day, hour, minute, tzinfo=timezone.utc)
+
+
+class FakeGraphTestCase(unittest.TestCase):
+    def start_server(self, messages=None, events=None, page_size=3):
+        server = FakeGraphServer(messages=messages, events=events, page_size=page_size).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def service(self, server, slim=True):
+        return BusinessActivityService(None, None, account=server.account(), slim=slim)
+
+
+class FetchActivitiesConcurrentlyTest(FakeGraphTestCase):
+    def test_pages_through_every_message_once(self):
+        inbox = [message('in-{}'.format(n), at(1 + n % 4, 8 + n % 10)) for n in range(20)]
+        sent = [message('sent-{}'.format(n), at(2, 10 + n)) for n in range(5)]
+        # Exactly on a window edge: belongs to the window that starts there.
+        inbox.append(message('in-midnight', at(3, 0)))
+        server = self.start_server(messages={'Inbox': inbox, 'SentItems': sent})
+
+        activities = self.service(server).fetch_activities_concurrently(
+            date(2024, 3, 1), date(2024, 3, 5), max_workers=4)
+
+        ids = [a.id for a in activities]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {m['id'] for m in inbox + sent})
+        self.assertEqual([a.started_at for a in activities],
+                         sorted(a.started_at for a in activities))
+
+    def test_keeps_meetings_that_cross_window_edges(self):
+        meetings = [
+            event('late', at(1, 23), at(2, 1)),
+            event('multi-day', at(2, 15), at(4, 10)),
+            event('inside', at(3, 10), at(3, 11)),
+            event('before-range', at(1, 0) - timedelta(hours=2), at(1, 1)),
+            event('after-range', at(5, 10), at(5, 11))
+        ]
+        server = self.start_server(events=meetings)
+
+        activities = self.service(server).fetch_activities_concurrently(
+            date(2024, 3, 1), date(2024, 3, 5), window_days=1)
+
+        self.assertEqual([a.id for a in activities], ['late', 'multi-day', 'inside'])
+        # Every window that overlaps a meeting sees it; only one keeps it.
+        self.assertEqual(len(server.paths('/v1.0/me/calendars/calendar-1/calendarView')), 4)
+
+    def test_expands_recurring_meetings_once(self):
+        master, occurrences = series('weekly', at(1, 14), timedelta(hours=1), 4, days_apart=2)
+        server = self.start_server(events=[master] + occurrences)
+
+        activities = self.service(server).fetch_activities_concurrently(
+            date(2024, 3, 1), date(2024, 3, 8), window_days=3)
+
+        self.assertEqual([a.id for a in activities], ['weekly-0', 'weekly-1', 'weekly-2',
+                                                      'weekly-3'])
+        self.assertTrue(all(a.resource == 'meeting' for a in activities))
+
+
+class SyncActivitiesTest(FakeGraphTestCase):
+    def setUp(self):
+        self.cache = ActivityCache(':memory:')
+        self.addCleanup(self.cache.close)
+
+    @staticmethod
+    def after_sync():
+        # Graph stamps edits with server time, which is after the sync that preceded them.
+        return datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    def test_fetches_parts_of_range_outside_synced_range(self):
+        inbox = [message('in-{}'.format(day), at(day)) for day in range(1, 15)]
+        server = self.start_server(messages={'Inbox': inbox})
+        service = self.service(server)
+
+        service.sync_activities(self.cache, date(2024, 3, 8), date(2024, 3, 10))
+        activities = service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 14))
+
+        self.assertEqual([a.id for a in activities], ['in-{}'.format(day) for day in range(1, 14)])
+        self.assertEqual(self.cache.synced_range, (date(2024, 3, 1), date(2024, 3, 14)))
+
+    def test_only_fetches_changes_inside_synced_range(self):
+        server = self.start_server(messages={'Inbox': [message('in-1', at(2))]})
+        service = self.service(server)
+
+        service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 7))
+        server.messages['Inbox'].append(message('in-2', at(3), modified_at=self.after_sync()))
+        server.requests.clear()
+        activities = service.sync_activities(self.cache, date(2024, 3, 2), date(2024, 3, 5))
+
+        self.assertEqual([a.id for a in activities], ['in-1', 'in-2'])
+        filters = [params['$filter'] for path, params in server.requests if '$filter' in params]
+        self.assertTrue(all(f.startswith('lastModifiedDateTime ge') for f in filters))
+
+    def test_ignores_changes_outside_synced_range(self):
+        server = self.start_server(messages={'Inbox': [message('in-1', at(2))]})
+        service = self.service(server)
+
+        service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 7))
+        server.messages['Inbox'].append(message('in-old', datetime(2023, 1, 5, tzinfo=timezone.utc),
+                                                modified_at=self.after_sync()))
+        service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 7))
+
+        cached = self.cache.activities_between(date(2000, 1, 1), date(2100, 1, 1))
+        self.assertEqual([a.id for a in cached], ['in-1'])
+
+    def test_range_is_in_utc_whatever_the_local_timezone(self):
+        # Midnight on 5 March here is 11:00 UTC on the 4th.
+        self.set_timezone('Pacific/Auckland')
+        inbox = [message('in-4', at(4, 18)), message('in-5', at(5, 0, 30))]
+        server = self.start_server(messages={'Inbox': inbox})
+
+        activities = self.service(server).sync_activities(
+            self.cache, date(2024, 3, 1), date(2024, 3, 5))
+
+        self.assertEqual([a.id for a in activities], ['in-4'])
+
+    def set_timezone(self, name):
+        def restore(previous):
+            if previous is None:
+                os.environ.pop('TZ', None)
+            else:
+                os.environ['TZ'] = previous
+            time.tzset()
+
+        self.addCleanup(restore, os.environ.get('TZ'))
+        os.environ['TZ'] = name
+        time.tzset()
+
+    def test_expands_changed_recurring_meetings(self):
+        master, occurrences = series('standup', at(1, 9), timedelta(minutes=15), 5, days_apart=2)
+        server = self.start_server(events=[master] + occurrences)
+        service = self.service(server)
+
+        service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 14))
+        edited = self.after_sync()
+        master, occurrences = series('standup', at(1, 10), timedelta(minutes=15), 6,
+                                     days_apart=2, subject='Standup (moved)', modified_at=edited)
+        server.events = [master] + occurrences
+        activities = service.sync_activities(self.cache, date(2024, 3, 1), date(2024, 3, 14))
+
+        self.assertEqual([a.id for a in activities], ['standup-{}'.format(n) for n in range(6)])
+        self.assertEqual({a.title for a in activities}, {'Standup (moved)'})
+        self.assertEqual({a.started_at.hour for a in activities}, {10})
+        self.assertIn('/v1.0/me/events/standup/instances', server.paths())
+
+
+class SlimActivitiesTest(FakeGraphTestCase):
+    def test_parses_meeting_bodies_only_when_used(self):
+        server = self.start_server(messages={'Inbox': [message('in-1', at(1))]},
+                                   events=[event('planning', at(1, 10), at(1, 11))])
+
+        activities = self.service(server).fetch_activities_concurrently(
+            date(2024, 3, 1), date(2024, 3, 2))
+        views = [params for path, params in server.requests if path.endswith('calendarView')]
+        meeting = [a for a in activities if a.resource == 'meeting'][0]
+
+        self.assertIn('body', views[0]['$select'].split(','))
+        self.assertIs(meeting._description, NOT_LOADED)
+        self.assertIn('Agenda for planning', meeting.description)
+        # The body came with the calendar view: no request per meeting.
+        self.assertEqual(server.paths('/v1.0/me/events/'), [])
+
+    def test_reads_raw_data_by_id_only_when_used(self):
+        server = self.start_server(messages={'Inbox': [message('in-1', at(1))]},
+                                   events=[event('planning', at(1, 10), at(1, 11))])
+
+        activities = self.service(server).fetch_activities_concurrently(
+            date(2024, 3, 1), date(2024, 3, 2))
+        self.assertEqual(server.paths('/v1.0/me/messages/'), [])
+
+        email, meeting = sorted(activities, key=lambda a: a.resource)
+        self.assertEqual(email.data['subject'], 'Message in-1')
+        self.assertEqual(meeting.data['body']['content'], '<p>Agenda for planning</p>')
+        self.assertEqual(server.paths('/v1.0/me/messages/'), ['/v1.0/me/messages/in-1'])
+        self.assertEqual(server.paths('/v1.0/me/events/'), ['/v1.0/me/events/planning'])
+
+    def test_activities_do_not_keep_fetched_objects(self):
+        server = self.start_server(messages={'Inbox': [message('in-1', at(1))]},
+                                   events=[event('planning', at(1, 10), at(1, 11))])
+
+        for slim in (True, False):
+            activities = self.service(server, slim=slim).fetch_activities_concurrently(
+                date(2024, 3, 1), date(2024, 3, 2))
+            gc.collect()
+
+            self.assertEqual(len(activities), 2)
+            self.assertFalse([o for o in gc.get_objects() if isinstance(o, (Message, Event))])
+
+
+class FakeBatchExporter(BatchExporter):
+    """Connects each account to its own fake server and records what it does."""
+    def __init__(self, servers, **options):
+        accounts = [{'name': name, 'client_id': None, 'secret_id': None} for name in servers]
+        super().__init__(accounts, **options)
+        self.servers = servers
+        self.connected_on = set()
+        self.batches = []
+
+    def connect(self, account):
+        self.connected_on.add(threading.current_thread().name)
+        server = self.servers[account['name']]
+        service = BusinessActivityService(None, None, account=server.account(), slim=True)
+        self.mount(service.account)
+        return service
+
+    def write(self, name, activities):
+        self.batches.append((name, len(activities)))
+        super().write(name, activities)
+
+
+class BatchExporterTest(FakeGraphTestCase):
+    def test_writes_each_window_as_it_arrives(self):
+        servers = {}
+        for name, count in (('north', 6), ('south', 4)):
+            inbox = [message('{}-{}'.format(name, n), at(1 + n % 3, 9 + n)) for n in range(count)]
+            meetings = [event('{}-meeting'.format(name), at(2, 13), at(2, 14))]
+            servers[name] = self.start_server(messages={'Inbox': inbox}, events=meetings)
+        out_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(out_dir.cleanup)
+
+        exporter = FakeBatchExporter(servers, out_dir=out_dir.name, combined=True,
+                                     requests_per_second=100)
+        results = exporter.export(date(2024, 3, 1), date(2024, 3, 4))
+
+        self.assertEqual(results, {'north': 7, 'south': 5})
+        self.assertEqual(exporter.connected_on, {threading.main_thread().name})
+        # Descriptions come from the windowed fetches, not a request per meeting.
+        self.assertEqual([s.paths('/v1.0/me/events/') for s in servers.values()], [[], []])
+        # Three windows, each with inbox, sent and calendar fetches, per account.
+        self.assertEqual(len(exporter.batches), 2 * 3 * 3)
+        with open(os.path.join(out_dir.name, 'o365-activities-all.csv'), newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][0], 'Account')
+        self.assertEqual(len(rows), 1 + 12)
+
+    def test_mount_keeps_retries(self):
+        server = self.start_server()
+        account = server.account()
+        retries = account.con.get_session(load_token=True).get_adapter('https://').max_retries
+
+        BatchExporter([]).mount(account)
+
+        adapter = account.con.session.get_adapter('https://')
+        self.assertIsInstance(adapter, ThrottledAdapter)
+        self.assertGreater(retries.total, 0)
+        self.assertEqual(adapter.max_retries.total, retries.total)
+        self.assertEqual(adapter.max_retries.status_forcelist, retries.status_forcelist)
+
+
+if __name__ == '__main__':
+    unittest.main()
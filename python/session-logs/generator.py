@@ -0,0 +1,144 @@
+"""
+High-volume synthetic session log generator for load testing.
+
+Follows the same scenario mix as Puzzler.SCHEMA but streams records straight
+to disk in batches instead of building every Session in memory. Rather than
+running the Session.login().home().pay() chain per record, each scenario is
+run a fixed number of times up front to collect a pool of "shapes" (relative
+timestamps and action streams). Generation then only draws a scenario, a
+shape, a start time and a user id per scenario, and formats strings.
+
+Output is reproducible for a given seed and shard count.
+
+Usage:
+generator = SessionGenerator.from_puzzler(Puzzler.construct(), seed=42)
+generator.to_file('sessions.ndjson', 100000000, workers=8)
+
+python generator.py sessions.ndjson 100000000 --workers 8 --seed 42
+"""
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from models.session import InvalidSession
+from puzzler import Puzzler
+
+
+class SessionGenerator:
+    BATCH_SIZE = 50000
+    SHAPES_PER_SCENARIO = 1024
+
+    @staticmethod
+    def from_puzzler(puzzler, seed=None):
+        return SessionGenerator(puzzler.schema, puzzler.unix_start_after,
+                                puzzler.unix_end_by, seed)
+
+    def __init__(self, schema, start_ts, end_ts, seed=None):
+        self.schema = schema
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.weights = [count for _, _, count in schema]
+        self.shapes = self.collect_shapes()
+
+    def collect_shapes(self):
+        """Runs every scenario SHAPES_PER_SCENARIO times against a fixed start
+        time. Session draws from the global random module, so its state is
+        seeded here and restored afterwards.
+        """
+        state = random.getstate()
+        random.seed(self.seed)
+        base_ts = self.start_ts
+
+        try:
+            shapes = []
+            for method, args, _ in self.schema:
+                pool = []
+                for n in range(self.SHAPES_PER_SCENARIO):
+                    sessions = method(*args, base_ts)
+                    pool.append(tuple(
+                        (int(s.timestamp) - base_ts, s.action_stream, isinstance(s, InvalidSession))
+                        for s in sessions))
+                shapes.append(pool)
+            return shapes
+        finally:
+            random.setstate(state)
+
+    #
+    # Generation
+    #
+    def logs(self, count, shard=0):
+        """Yields lists of up to BATCH_SIZE log strings, count logs in total."""
+        rng = random.Random(self.seed * 1000003 + shard)
+        scenarios = range(len(self.schema))
+        remaining = count
+
+        while remaining > 0:
+            batch = []
+            picks = rng.choices(scenarios, self.weights, k=min(remaining, self.BATCH_SIZE))
+
+            for scenario in picks:
+                ts = rng.randint(self.start_ts, self.end_ts)
+                user_id = rng.randint(1, 999999999)
+                for offset, action_stream, invalid in rng.choice(self.shapes[scenario]):
+                    if invalid:
+                        batch.append('{}{}'.format(ts + offset, action_stream))
+                    else:
+                        batch.append('{}{:09d}{}'.format(ts + offset, user_id, action_stream))
+
+            del batch[remaining:]
+            remaining -= len(batch)
+            yield batch
+
+    def write(self, path, count, shard=0):
+        """Writes count logs to path: a JSON array, or NDJSON if path ends in
+        .ndjson or .jsonl.
+        """
+        ndjson = path.endswith(('.ndjson', '.jsonl'))
+
+        with open(path, 'w') as f:
+            f.write('' if ndjson else '[')
+            first = True
+            for batch in self.logs(count, shard):
+                # Logs never contain characters that need JSON escaping.
+                quoted = ['"{}"'.format(log) for log in batch]
+                if ndjson:
+                    f.write('\n'.join(quoted) + '\n')
+                else:
+                    f.write(('' if first else ', ') + ', '.join(quoted))
+                first = False
+            f.write('' if ndjson else ']')
+        return path
+
+    def to_file(self, path, count, workers=1):
+        """Writes count logs, split across workers shard files when workers > 1
+        (e.g. sessions.0000.ndjson). Returns the paths written.
+        """
+        if workers <= 1:
+            return [self.write(path, count)]
+
+        root, ext = os.path.splitext(path)
+        paths = ['{}.{:04d}{}'.format(root, n, ext) for n in range(workers)]
+        counts = [count // workers + (n < count % workers) for n in range(workers)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.write, shard_path, shard_count, n)
+                       for n, (shard_path, shard_count) in enumerate(zip(paths, counts))]
+            return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic session logs.')
+    parser.add_argument('path')
+    parser.add_argument('count', type=int)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    generator = SessionGenerator.from_puzzler(Puzzler.construct(), args.seed)
+    for path in generator.to_file(args.path, args.count, args.workers):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
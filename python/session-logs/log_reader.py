@@ -0,0 +1,207 @@
+"""
+Incremental reader for session logs.
+
+Accepts either a serialized JSON array of log strings (the format Puzzler
+produces) or newline-delimited logs (one JSON string or bare log per line).
+Records are yielded one at a time so the full dump never needs to be held in
+memory.
+
+Usage:
+reader = LogReader.from_file('session_log.json')
+for log in reader:
+    ...
+"""
+import codecs
+import io
+import itertools
+import json
+import os
+
+
+class LogReader:
+    CHUNK_SIZE = 1 << 20
+    WHITESPACE = ' \t\r\n'
+
+    @staticmethod
+    def from_file(path, chunk_size=None):
+        return LogReader(open(path, 'r'), chunk_size, close=True)
+
+    @staticmethod
+    def from_string(serialized_logs, chunk_size=None):
+        return LogReader(io.StringIO(serialized_logs), chunk_size)
+
+    @staticmethod
+    def from_range(path, start, end, chunk_size=None):
+        """Reads only the records in byte range [start, end) of path. The range
+        must come from shard_ranges so it falls on record boundaries.
+        """
+        return LogReader(RangeStream(path, start, end), chunk_size, close=True)
+
+    @staticmethod
+    def shard_ranges(path, count):
+        """Splits path into at most count byte ranges, each holding whole
+        records. Records may not contain the separator (',' inside a JSON
+        array, newline otherwise), which holds for the session log format.
+        """
+        size = os.path.getsize(path)
+        bounds = [0]
+
+        with open(path, 'rb') as f:
+            head = f.read(LogReader.CHUNK_SIZE).lstrip()
+            separator = b',' if head.startswith(b'[') else b'\n'
+
+            for n in range(1, count):
+                offset = max(size * n // count, bounds[-1])
+                bound = LogReader.next_boundary(f, offset, separator, size)
+                if bound > bounds[-1]:
+                    bounds.append(bound)
+
+        if size > bounds[-1]:
+            bounds.append(size)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    @staticmethod
+    def next_boundary(f, offset, separator, size):
+        f.seek(offset)
+        while True:
+            chunk = f.read(LogReader.CHUNK_SIZE)
+            if not chunk:
+                return size
+            i = chunk.find(separator)
+            if i >= 0:
+                return offset + i + 1
+            offset += len(chunk)
+
+    def __init__(self, stream, chunk_size=None, close=False):
+        self.stream = stream
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.close = close
+        self.decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        try:
+            first = self.peek()
+            if first == '[':
+                yield from self.iter_array()
+            elif first:
+                yield from self.iter_lines()
+        finally:
+            if self.close:
+                self.stream.close()
+
+    #
+    # Private Methods
+    #
+    def peek(self):
+        self.buffer = ''
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                return ''
+            self.buffer = chunk.lstrip(self.WHITESPACE)
+            if self.buffer:
+                return self.buffer[0]
+
+    def iter_array(self):
+        buffer = self.buffer[1:]
+        pos = 0
+        eof = False
+
+        while True:
+            # Skip separators between records.
+            while pos < len(buffer) and buffer[pos] in self.WHITESPACE + ',':
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            try:
+                log, end = self.decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Record straddles a chunk boundary: read more and retry.
+                if eof:
+                    raise
+                chunk = self.stream.read(self.chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            # A complete string literal always ends with its closing quote, so
+            # a record ending exactly at the buffer edge is still whole.
+            yield log
+            pos = end
+
+    def iter_lines(self):
+        # Complete the partial line left at the end of the first chunk.
+        head = io.StringIO(self.buffer + self.stream.readline())
+        for line in itertools.chain(head, self.stream):
+            log = LogReader.parse_line(line)
+            if log:
+                yield log
+
+    @staticmethod
+    def parse_line(line):
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith('"'):
+            return json.loads(line)
+        return line
+
+
+class RangeStream:
+    """Read-only text stream over a byte range of a log file. Ranges cut from
+    the middle of a JSON array are re-wrapped in brackets so LogReader parses
+    them like a whole array.
+    """
+    def __init__(self, path, start, end):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.prefix = ''
+        self.suffix = ''
+
+        if self.is_array(path):
+            self.prefix = '[' if start > 0 else ''
+            self.suffix = ']'
+
+    def is_array(self, path):
+        with open(path, 'rb') as f:
+            return f.read(LogReader.CHUNK_SIZE).lstrip().startswith(b'[')
+
+    def read(self, size=-1):
+        if self.prefix:
+            text, self.prefix = self.prefix, ''
+            return text
+
+        while self.remaining > 0:
+            size = self.remaining if size < 0 else min(max(size, 1), self.remaining)
+            data = self.file.read(size)
+            self.remaining = self.remaining - len(data) if data else 0
+            text = self.decoder.decode(data, final=self.remaining == 0)
+            if text:
+                return text
+
+        text, self.suffix = self.suffix, ''
+        return text
+
+    def readline(self):
+        # Only used for newline-delimited logs, which never need wrapping.
+        line = bytearray()
+        while self.remaining > 0 and not line.endswith(b'\n'):
+            data = self.file.readline(min(self.remaining, LogReader.CHUNK_SIZE))
+            self.remaining = self.remaining - len(data) if data else 0
+            line += data
+        return self.decoder.decode(bytes(line), final=self.remaining == 0)
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self):
+        self.file.close()
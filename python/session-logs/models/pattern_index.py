@@ -0,0 +1,126 @@
+"""
+N-gram index over session action streams.
+
+Every k-gram (k <= max_gram) of every action stream is mapped to the sessions
+containing it, with an occurrence count and first/last positions per session.
+Built once, it answers pattern and funnel questions by lookup instead of
+rescanning every stream:
+
+index = PatternIndex.from_streams(s.action_stream for s in solver.sessions)
+index.sessions_with('P*H')          # session ids containing P*H
+index.followed_by('P*', '$')        # ...and paid at some point after
+index.failure_types()               # {('P', 'H'): 24, ('P', 'B'): 7}
+
+Session ids are positions in the sequence the index was built from. Patterns
+longer than max_gram are narrowed with the index and then verified against
+the stored streams.
+"""
+COUNT, FIRST, LAST = range(3)
+
+
+class PatternIndex:
+    MAX_GRAM = 4
+
+    @staticmethod
+    def from_streams(action_streams, max_gram=None):
+        index = PatternIndex(max_gram or PatternIndex.MAX_GRAM)
+        for action_stream in action_streams:
+            index.add(action_stream)
+        return index
+
+    def __init__(self, max_gram=MAX_GRAM):
+        self.max_gram = max_gram
+        self.streams = []
+        self.postings = {}
+
+    def add(self, action_stream):
+        sid = len(self.streams)
+        self.streams.append(action_stream)
+
+        for i in range(len(action_stream)):
+            for k in range(1, min(self.max_gram, len(action_stream) - i) + 1):
+                posting = self.postings.setdefault(action_stream[i:i+k], {})
+                hit = posting.get(sid)
+                if hit is None:
+                    posting[sid] = [1, i, i]
+                else:
+                    hit[COUNT] += 1
+                    hit[LAST] = i
+        return sid
+
+    #
+    # Queries
+    #
+    def sessions_with(self, pattern):
+        return sorted(self.hits(pattern))
+
+    def count(self, pattern):
+        """Total (overlapping) occurrences of pattern across all sessions."""
+        return sum(hit[COUNT] for hit in self.hits(pattern).values())
+
+    def followed_by(self, pattern, then):
+        """Sessions where then occurs somewhere after an occurrence of pattern."""
+        first_hits = self.hits(pattern)
+        then_hits = self.hits(then)
+        return sorted(sid for sid in first_hits.keys() & then_hits.keys()
+                      if first_hits[sid][FIRST] + len(pattern) <= then_hits[sid][LAST])
+
+    def failure_types(self):
+        """Counts of each (before, after) pair around a failed payment."""
+        types = {}
+        for gram, posting in self.postings.items():
+            if len(gram) == 3 and gram[1] == '*':
+                types[(gram[0], gram[2])] = sum(hit[COUNT] for hit in posting.values())
+        return types
+
+    def recoveries_by_seq_pct(self, seq):
+        """Share of seq failures in sessions that paid after their last failure."""
+        before, after = seq
+        posting = self.postings[before + '*' + after]
+        paid = self.postings.get('$', {})
+        failed = self.postings['*']
+
+        failures = sum(hit[COUNT] for hit in posting.values())
+        recoveries = sum(hit[COUNT] for sid, hit in posting.items()
+                         if sid in paid and paid[sid][LAST] > failed[sid][LAST])
+        return recoveries / failures * 100
+
+    #
+    # Private Methods
+    #
+    def hits(self, pattern):
+        """Maps session id -> [count, first, last] for pattern."""
+        if len(pattern) <= self.max_gram:
+            return self.postings.get(pattern, {})
+
+        # Narrow to sessions holding every max_gram slice, then verify.
+        k = self.max_gram
+        slices = [pattern[i:i+k] for i in range(0, len(pattern) - k + 1, k)]
+        slices.append(pattern[-k:])
+        candidates = set(self.postings.get(slices[0], {}))
+        for gram in slices[1:]:
+            candidates &= self.postings.get(gram, {}).keys()
+
+        hits = {}
+        for sid in sorted(candidates):
+            hit = self.scan(self.streams[sid], pattern)
+            if hit:
+                hits[sid] = hit
+        return hits
+
+    @staticmethod
+    def scan(action_stream, pattern):
+        count = 0
+        first = last = action_stream.find(pattern)
+        while last >= 0:
+            count += 1
+            pos = last
+            last = action_stream.find(pattern, pos + 1)
+        return [count, first, pos] if count else None
+
+    def __len__(self):
+        return len(self.streams)
+
+    def __repr__(self):
+        f = '<PatternIndex sessions={} grams={}>'
+        return f.format(len(self), len(self.postings))
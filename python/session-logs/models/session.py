@@ -1,5 +1,7 @@
 from random import randint, choice, shuffle
 from datetime import datetime
+from functools import cached_property
+from models.timestamps import DECODER
 
 
 class Session:
@@ -165,11 +167,18 @@ class Session:
     def payments_failed(self):
         return self.action_stream.count('*')
 
-    @property
-    def created_at(self):
+    @cached_property
+    def epoch(self):
+        # Decoded once. The timestamp is fixed once a session is constructed.
         if not self.timestamp:
             return None
-        return datetime.fromtimestamp(int(self.timestamp))
+        return int(self.timestamp)
+
+    @cached_property
+    def created_at(self):
+        if self.epoch is None:
+            return None
+        return DECODER.decode(self.epoch)
 
     #
     # Action Stream Actions
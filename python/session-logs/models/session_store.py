@@ -0,0 +1,164 @@
+"""
+Columnar, array-backed session store.
+
+Sessions are held column-wise in typed arrays instead of one Session object per
+log:
+
+- timestamps: int64
+- user ids: uint32 (9-digit ids fit; malformed ids are interned, see below)
+- action streams: one concatenated byte buffer with uint64 offsets
+- '$' and '*' counts per session: uint32, computed once at build time
+
+Counts over the store run through C-level helpers (array slicing, bytes.count,
+itertools.compress) rather than per-object Python code.
+
+Usage:
+store = SessionStore.from_logs(LogReader.from_file('session_log.json'))
+store.report()
+"""
+from array import array
+from itertools import compress
+from models.timestamps import DECODER
+
+
+class SessionStore:
+    # Valid user ids are at most 9 digits, so codes from here up are free to
+    # intern malformed ids (e.g. from InvalidSession logs).
+    ODD_USER_ID_BASE = 10 ** 9
+
+    @staticmethod
+    def from_logs(logs):
+        store = SessionStore()
+        for log in logs:
+            store.append(log)
+        return store
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.user_ids = array('I')
+        self.offsets = array('Q', [0])
+        self.actions = bytearray()
+        self.paid_counts = array('I')
+        self.failed_counts = array('I')
+        self.odd_user_ids = {}
+
+    def append(self, log):
+        user_id = log[10:19]
+        actions = log[19:].encode('ascii')
+
+        self.timestamps.append(int(log[:10]))
+        self.user_ids.append(self.user_code(user_id))
+        self.actions += actions
+        self.offsets.append(len(self.actions))
+        self.paid_counts.append(actions.count(b'$'))
+        self.failed_counts.append(actions.count(b'*'))
+        return self
+
+    def user_code(self, user_id):
+        if user_id.isdigit():
+            return int(user_id)
+        if user_id not in self.odd_user_ids:
+            self.odd_user_ids[user_id] = self.ODD_USER_ID_BASE + len(self.odd_user_ids)
+        return self.odd_user_ids[user_id]
+
+    #
+    # Accessors
+    #
+    def __len__(self):
+        return len(self.timestamps)
+
+    def action_stream(self, n):
+        return self.actions[self.offsets[n]:self.offsets[n + 1]].decode('ascii')
+
+    def count_in_session(self, n, char):
+        return self.actions.count(char.encode('ascii'), self.offsets[n], self.offsets[n + 1])
+
+    #
+    # Basic Questions
+    #
+    @property
+    def session_count(self):
+        return len(self)
+
+    @property
+    def failed_session_count(self):
+        return len(self) - self.failed_counts.count(0)
+
+    @property
+    def paid_session_count(self):
+        return len(self) - self.paid_counts.count(0)
+
+    @property
+    def when(self):
+        return (DECODER.decode(min(self.timestamps)), DECODER.decode(max(self.timestamps)))
+
+    @property
+    def dates(self):
+        return DECODER.by_date(self.timestamps)
+
+    #
+    # Intermediate Questions
+    #
+    @property
+    def unique_users(self):
+        return set(self.user_ids)
+
+    @property
+    def paid_users(self):
+        return set(compress(self.user_ids, self.paid_counts))
+
+    @property
+    def failed_users(self):
+        return set(compress(self.user_ids, self.failed_counts))
+
+    @property
+    def failed_paid_users(self):
+        return self.failed_users & self.paid_users
+
+    @property
+    def payments_succeeded(self):
+        return sum(self.paid_counts)
+
+    @property
+    def payments_failed(self):
+        return sum(self.failed_counts)
+
+    @property
+    def payments_attempted(self):
+        return self.payments_succeeded + self.payments_failed
+
+    @property
+    def users_failed_pct(self):
+        failed_only = len(self.failed_users) - len(self.failed_paid_users)
+        return failed_only / len(self.unique_users) * 100
+
+    def report(self):
+        """Answers the basic and intermediate sections of Solver.report()."""
+        return {
+            'basic': {
+                'sessions': self.session_count,
+                'sessions failed': self.failed_session_count,
+                'sessions paid': self.paid_session_count,
+                'when': self.when
+            },
+            'intermediate': {
+                'unique users': len(self.unique_users),
+                'users paid': len(self.paid_users),
+                'users failed': len(self.failed_users),
+                'users failed then paid': len(self.failed_paid_users),
+                'payments attempted': self.payments_attempted,
+                'payments failed': self.payments_failed,
+                'payment failed %': self.payments_failed / self.payments_attempted * 100,
+                'user failed %': self.users_failed_pct
+            }
+        }
+
+    def __repr__(self):
+        f = '<SessionStore sessions={} bytes={}>'
+        return f.format(len(self), self.nbytes)
+
+    @property
+    def nbytes(self):
+        columns = (self.timestamps, self.user_ids, self.offsets, self.paid_counts,
+                   self.failed_counts)
+        return sum(c.itemsize * len(c) for c in columns) + len(self.actions)
@@ -0,0 +1,63 @@
+"""
+Epoch -> datetime decoding for session timestamps.
+
+datetime.fromtimestamp consults the timezone rules on every call. UTC offsets
+only change on quarter-hour boundaries, so TimestampDecoder resolves each
+15-minute bucket once and derives every other timestamp in it by adding
+seconds. Grouping by date ("on what date(s)...") works on the buckets alone
+and never builds a datetime per timestamp.
+
+Usage:
+DECODER.decode(1667203254)                  # naive local time, like fromtimestamp
+TimestampDecoder(timezone.utc).by_date(epochs)   # {date: count}
+"""
+from datetime import datetime, timedelta
+
+
+class TimestampDecoder:
+    BUCKET_SECONDS = 900
+    MAX_BUCKETS = 1 << 16
+
+    def __init__(self, tz=None):
+        # tz=None decodes to naive local time, matching datetime.fromtimestamp.
+        self.tz = tz
+        self.buckets = {}
+        self.seconds = [timedelta(seconds=n) for n in range(self.BUCKET_SECONDS)]
+
+    def decode(self, epoch):
+        bucket, second = divmod(int(epoch), self.BUCKET_SECONDS)
+        start = self.buckets.get(bucket)
+        if start is None:
+            start = self.bucket_start(bucket)
+        value = start + self.seconds[second]
+        # Timedelta arithmetic drops fold, which marks the repeated DST hour.
+        return value.replace(fold=1) if start.fold else value
+
+    def decode_all(self, epochs):
+        return [self.decode(epoch) for epoch in epochs]
+
+    def by_date(self, epochs):
+        """Counts epochs per calendar date. A bucket never straddles midnight,
+        so each bucket's date is looked up once.
+        """
+        bucket_counts = {}
+        for epoch in epochs:
+            bucket = int(epoch) // self.BUCKET_SECONDS
+            bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
+
+        dates = {}
+        for bucket in sorted(bucket_counts):
+            date = (self.buckets.get(bucket) or self.bucket_start(bucket)).date()
+            dates[date] = dates.get(date, 0) + bucket_counts[bucket]
+        return dates
+
+    def bucket_start(self, bucket):
+        if len(self.buckets) >= self.MAX_BUCKETS:
+            self.buckets.clear()
+        start = datetime.fromtimestamp(bucket * self.BUCKET_SECONDS, self.tz)
+        self.buckets[bucket] = start
+        return start
+
+
+# Shared decoder for naive local times, as Session.created_at has always used.
+DECODER = TimestampDecoder()
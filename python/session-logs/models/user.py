@@ -1,3 +1,6 @@
+from models.timestamps import DECODER
+
+
 class User:
     def __init__(self, id, sessions):
         self.id = id
@@ -24,9 +27,71 @@ class User:
     def sessions_span(self):
         if len(self.sessions) < 2:
             return None
-        sorted_sessions = sorted(self.sessions, key=lambda s: s.created_at)
-        return sorted_sessions[-1].created_at - sorted_sessions[0].created_at
+        epochs = [s.epoch for s in self.sessions]
+        return DECODER.decode(max(epochs)) - DECODER.decode(min(epochs))
 
     def __repr__(self):
         f = '<User id={} sessions={}>'
         return f.format(self.id, len(self.sessions))
+
+
+class UserStats:
+    """Running per-user aggregates. Stands in for User when the sessions
+    themselves are not retained (see StreamSolver).
+    """
+    __slots__ = ('id', 'session_count', 'first_seen', 'min_ts', 'max_ts',
+                 'has_paid', 'has_failed')
+
+    def __init__(self, id, session_count=0, first_seen=None, min_ts=None, max_ts=None,
+                 has_paid=False, has_failed=False):
+        self.id = id
+        self.session_count = session_count
+        self.first_seen = first_seen
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.has_paid = has_paid
+        self.has_failed = has_failed
+
+    def add(self, ts, seq, action_stream):
+        """ts is the session's integer timestamp and seq its position in the
+        logs, used to break ties the way a stable sort would.
+        """
+        self.session_count += 1
+        if self.first_seen is None or (ts, seq) < self.first_seen:
+            self.first_seen = (ts, seq)
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        self.has_paid = self.has_paid or '$' in action_stream
+        self.has_failed = self.has_failed or '*' in action_stream
+        return self
+
+    def merge(self, other):
+        """Folds in stats for the same user gathered from another shard."""
+        self.session_count += other.session_count
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.min_ts = min(self.min_ts, other.min_ts)
+        self.max_ts = max(self.max_ts, other.max_ts)
+        self.has_paid = self.has_paid or other.has_paid
+        self.has_failed = self.has_failed or other.has_failed
+        return self
+
+    def paid(self):
+        return self.has_paid
+
+    def failed(self):
+        return self.has_failed
+
+    def failed_then_paid(self):
+        if not self.failed():
+            return False
+        return self.paid()
+
+    @property
+    def sessions_span(self):
+        if self.session_count < 2:
+            return None
+        return DECODER.decode(self.max_ts) - DECODER.decode(self.min_ts)
+
+    def __repr__(self):
+        f = '<User id={} sessions={}>'
+        return f.format(self.id, self.session_count)
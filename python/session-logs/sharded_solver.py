@@ -0,0 +1,41 @@
+"""
+Multi-process StreamSolver.
+
+The log file is split into byte ranges on record boundaries, each range is
+aggregated by a StreamSolver in its own process, and the partial results are
+merged into a single report. Workers send back StreamSolver.to_partial()
+(arrays and strings) rather than the solver itself, so little time goes to
+pickling between processes.
+
+Usage:
+solution = ShardedSolver.from_file('session_log.json', workers=8)
+pprint(solution.report())
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from log_reader import LogReader
+from stream_solver import StreamSolver
+
+
+def solve_shard(path, start, end, shard):
+    # Module-level so it can be pickled for the worker processes.
+    return StreamSolver(shard).consume(LogReader.from_range(path, start, end)).to_partial()
+
+
+class ShardedSolver:
+    @staticmethod
+    def from_file(path, workers=None, shards=None):
+        workers = workers or os.cpu_count()
+        ranges = LogReader.shard_ranges(path, shards or workers)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(solve_shard, path, start, end, n)
+                       for n, (start, end) in enumerate(ranges)]
+            return ShardedSolver.merge(future.result() for future in futures)
+
+    @staticmethod
+    def merge(partials):
+        solver = StreamSolver()
+        for partial in partials:
+            solver.merge_partial(partial)
+        return solver
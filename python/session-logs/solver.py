@@ -19,7 +19,12 @@ Advanced Questions:
 - What do you recommend for next steps?
 """
 import json
+from functools import cached_property
+from log_reader import LogReader
+from models.pattern_index import PatternIndex
 from models.session import Session
+from models.session_store import SessionStore
+from models.timestamps import DECODER
 from models.user import User
 
 
@@ -35,10 +40,25 @@ class Solver:
     def logs(self):
         return json.loads(self.serialized_logs)
 
+    @cached_property
+    def store(self):
+        # Built once; answers the basic/intermediate questions without Sessions.
+        return SessionStore.from_logs(LogReader.from_string(self.serialized_logs))
+
+    @cached_property
+    def index(self):
+        # Session ids in the index are positions in self.sessions.
+        return PatternIndex.from_streams(s.action_stream for s in self.sessions)
+
     @property
     def sessions(self):
         sessions = [Session.from_log(log) for log in self.logs]
-        return sorted(sessions, key=lambda s: s.created_at)
+        return sorted(sessions, key=lambda s: s.epoch)
+
+    @property
+    def session_dates(self):
+        """Sessions per calendar date, decoded in bulk from the store."""
+        return DECODER.by_date(self.store.timestamps)
 
     @property
     def user_sessions(self):
@@ -132,9 +152,7 @@ class Solver:
         return recoveries
 
     def recoveries_by_seq_pct(self, seq):
-        recoveries = self.recoveries_by_seq(seq)
-        failures = self.failure_types[seq]
-        return len(recoveries) / len(failures) * 100
+        return self.index.recoveries_by_seq_pct(seq)
 
     def report(self):
         return {
@@ -165,7 +183,7 @@ class Solver:
                     self.user_with_most_sessions.sessions_span
                 ),
                 'invalid sessions': self.invalid_sessions,
-                'failure types': dict([(k, len(v)) for (k,v) in self.failure_types.items()]),
+                'failure types': self.index.failure_types(),
                 'recoveries post-P*H': self.recoveries_by_seq_pct(('P', 'H')),
                 'recoveries post-P*B': self.recoveries_by_seq_pct(('P', 'B'))
             }
@@ -0,0 +1,301 @@
+"""
+Single-pass alternative to Solver for large session dumps.
+
+Each log is parsed once as it is read and folded into running aggregates, so
+memory is bounded by the number of unique users rather than the number of
+sessions. report() returns the same dict as Solver.report(), with UserStats
+standing in for User.
+
+Usage:
+solution = StreamSolver.from_file('session_log.json')
+pprint(solution.report())
+"""
+import os
+import pickle
+from array import array
+from itertools import repeat
+from log_reader import LogReader
+from models.session import Session
+from models.timestamps import DECODER
+from models.user import UserStats
+
+
+class StreamSolver:
+    @staticmethod
+    def solve(serialized_logs):
+        return StreamSolver().consume(LogReader.from_string(serialized_logs))
+
+    @staticmethod
+    def from_file(path):
+        return StreamSolver().consume(LogReader.from_file(path))
+
+    def __init__(self, shard=0):
+        # Shard number orders sessions across shards when breaking ties.
+        self.shard = shard
+        self.session_count = 0
+        self.failed_session_count = 0
+        self.paid_session_count = 0
+        self.payments_succeeded = 0
+        self.payments_failed = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.users = {}
+        self.invalid = []
+        self.failure_counts = {}
+        self.recovery_counts = {}
+
+    #
+    # Aggregation
+    #
+    def consume(self, logs):
+        for log in logs:
+            self.add(log)
+        return self
+
+    def update(self, batch):
+        """Folds in a further batch of logs: a serialized JSON array (or
+        newline-delimited logs) or any iterable of log strings.
+        """
+        if isinstance(batch, str):
+            batch = LogReader.from_string(batch)
+        return self.consume(batch)
+
+    def add(self, log):
+        ts = int(log[:10])
+        user_id = log[10:19]
+        action_stream = log[19:]
+        seq = (self.shard, self.session_count)
+
+        self.session_count += 1
+        self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+        successes = action_stream.count('$')
+        failures = action_stream.count('*')
+        self.payments_succeeded += successes
+        self.payments_failed += failures
+        self.paid_session_count += successes > 0
+        self.failed_session_count += failures > 0
+
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = UserStats(user_id)
+        user.add(ts, seq, action_stream)
+
+        if not user_id.isdigit():
+            session = Session.from_log(log)
+            session.is_valid()
+            self.invalid.append((ts, seq, session))
+
+        if failures:
+            self.add_failures(action_stream)
+
+    def add_failures(self, action_stream):
+        recovered = '$' in action_stream.rsplit('*', 1)[1]
+        for i, char in enumerate(action_stream):
+            if char == '*':
+                key = (action_stream[i-1], action_stream[i+1])
+                self.failure_counts[key] = self.failure_counts.get(key, 0) + 1
+                if recovered:
+                    self.recovery_counts[key] = self.recovery_counts.get(key, 0) + 1
+
+    def merge(self, other):
+        """Folds another solver's aggregates into this one. Used to combine
+        partial results from shards of the same logs.
+        """
+        self.session_count += other.session_count
+        self.failed_session_count += other.failed_session_count
+        self.paid_session_count += other.paid_session_count
+        self.payments_succeeded += other.payments_succeeded
+        self.payments_failed += other.payments_failed
+        self.first_ts = self.min_of(self.first_ts, other.first_ts)
+        self.last_ts = self.max_of(self.last_ts, other.last_ts)
+        self.invalid += other.invalid
+
+        for user_id, stats in other.users.items():
+            if user_id in self.users:
+                self.users[user_id].merge(stats)
+            else:
+                self.users[user_id] = stats
+
+        for counts, other_counts in ((self.failure_counts, other.failure_counts),
+                                     (self.recovery_counts, other.recovery_counts)):
+            for key, count in other_counts.items():
+                counts[key] = counts.get(key, 0) + count
+
+        return self
+
+    def to_partial(self):
+        """Returns this solver's aggregates as plain tuples, strings and
+        arrays, which pickle far faster than the UserStats and Session objects
+        themselves. For sending a shard's results between processes; see
+        merge_partial.
+        """
+        users = list(self.users.values())
+        totals = (self.session_count, self.failed_session_count, self.paid_session_count,
+                  self.payments_succeeded, self.payments_failed, self.first_ts, self.last_ts)
+        columns = (
+            array('Q', [u.session_count for u in users]),
+            array('q', [u.first_seen[0] for u in users]),
+            array('Q', [u.first_seen[1][1] for u in users]),
+            array('q', [u.min_ts for u in users]),
+            array('q', [u.max_ts for u in users]),
+            array('B', [u.has_paid for u in users]),
+            array('B', [u.has_failed for u in users])
+        )
+        # Invalid sessions are rare; their logs are enough to rebuild them.
+        invalid = [(ts, seq[1], session.timestamp + session.user_id + session.action_stream)
+                   for ts, seq, session in self.invalid]
+        return (self.shard, totals, [u.id for u in users], columns, invalid,
+                self.failure_counts, self.recovery_counts)
+
+    def merge_partial(self, partial):
+        """Folds in aggregates returned by another solver's to_partial."""
+        shard, totals, user_ids, columns, invalid, failure_counts, recovery_counts = partial
+        session_count, failed, paid, succeeded, payments_failed, first_ts, last_ts = totals
+
+        self.session_count += session_count
+        self.failed_session_count += failed
+        self.paid_session_count += paid
+        self.payments_succeeded += succeeded
+        self.payments_failed += payments_failed
+        self.first_ts = self.min_of(self.first_ts, first_ts)
+        self.last_ts = self.max_of(self.last_ts, last_ts)
+
+        for ts, index, log in invalid:
+            session = Session.from_log(log)
+            session.is_valid()
+            self.invalid.append((ts, (shard, index), session))
+
+        session_counts, seen_ts, seen_index, min_ts, max_ts, has_paid, has_failed = columns
+        first_seen = zip(seen_ts, zip(repeat(shard), seen_index))
+        partial_users = map(UserStats, user_ids, session_counts, first_seen, min_ts, max_ts,
+                            map(bool, has_paid), map(bool, has_failed))
+
+        users = self.users
+        for user_id, stats in zip(user_ids, partial_users):
+            user = users.get(user_id)
+            if user is None:
+                users[user_id] = stats
+            else:
+                user.merge(stats)
+
+        for counts, other_counts in ((self.failure_counts, failure_counts),
+                                     (self.recovery_counts, recovery_counts)):
+            for key, count in other_counts.items():
+                counts[key] = counts.get(key, 0) + count
+
+        return self
+
+    #
+    # Checkpoints
+    #
+    @staticmethod
+    def restore(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def checkpoint(self, path):
+        # Write then rename so a crash never leaves a truncated checkpoint.
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def min_of(a, b):
+        return b if a is None else a if b is None else min(a, b)
+
+    @staticmethod
+    def max_of(a, b):
+        return b if a is None else a if b is None else max(a, b)
+
+    #
+    # Properties
+    #
+    @property
+    def payments_attempted(self):
+        return self.payments_succeeded + self.payments_failed
+
+    @property
+    def paid_users(self):
+        return [u for u in self.users.values() if u.paid()]
+
+    @property
+    def failed_users(self):
+        return [u for u in self.users.values() if u.failed()]
+
+    @property
+    def failed_paid_users(self):
+        return [u for u in self.users.values() if u.failed_then_paid()]
+
+    @property
+    def users_failed_pct(self):
+        failed_user_count = len(self.failed_users)
+        failed_paid_user_count = len(self.failed_paid_users)
+        return self.percent(failed_user_count - failed_paid_user_count, len(self.users))
+
+    @property
+    def user_with_most_sessions(self):
+        # Ties go to the user seen last, matching Solver's stable sort.
+        if not self.users:
+            return None
+        return max(self.users.values(), key=lambda u: (u.session_count, u.first_seen))
+
+    @property
+    def invalid_sessions(self):
+        return [session for _, _, session in sorted(self.invalid, key=lambda i: i[:2])]
+
+    @property
+    def failure_types(self):
+        return dict(self.failure_counts)
+
+    def recoveries_by_seq_pct(self, seq):
+        return self.percent(self.recovery_counts.get(seq, 0), self.failure_counts.get(seq, 0))
+
+    @staticmethod
+    def percent(part, whole):
+        # None until there is something to take a percentage of: report() may
+        # be called on a log that is still young (see TailingSolver).
+        return part / whole * 100 if whole else None
+
+    def report(self):
+        user_with_most_sessions = self.user_with_most_sessions
+        when = (None, None)
+        if self.session_count:
+            when = (DECODER.decode(self.first_ts), DECODER.decode(self.last_ts))
+
+        return {
+            # Basic Questions
+            'basic': {
+                'sessions': self.session_count,
+                'sessions failed': self.failed_session_count,
+                'sessions paid': self.paid_session_count,
+                'when': when
+            },
+
+            # Intermediate Questions
+            'intermediate': {
+                'unique users': len(self.users),
+                'users paid': len(self.paid_users),
+                'users failed': len(self.failed_users),
+                'users failed then paid': len(self.failed_paid_users),
+                'payments attempted': self.payments_attempted,
+                'payments failed': self.payments_failed,
+                'payment failed %': self.percent(self.payments_failed, self.payments_attempted),
+                'user failed %': self.users_failed_pct
+            },
+
+            # Advanced Questions
+            'advanced': {
+                'user with most sessions': (
+                    user_with_most_sessions,
+                    user_with_most_sessions.sessions_span if user_with_most_sessions else None
+                ),
+                'invalid sessions': self.invalid_sessions,
+                'failure types': self.failure_types,
+                'recoveries post-P*H': self.recoveries_by_seq_pct(('P', 'H')),
+                'recoveries post-P*B': self.recoveries_by_seq_pct(('P', 'B'))
+            }
+        }
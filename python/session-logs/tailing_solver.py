@@ -0,0 +1,106 @@
+"""
+StreamSolver that follows a growing newline-delimited log file.
+
+Each poll() reads only the complete lines appended since the last one and
+folds them into the existing aggregates, so report() is always current without
+replaying history. The read offset is part of the solver's state, so a
+checkpoint lets a restarted process pick up where it left off. Checkpoints are
+written every checkpoint_every lines, after a poll once checkpoint_seconds have
+passed since the last one, and when follow() stops. A file that shrinks or is
+replaced by a new one has been truncated or rotated, and is read again from
+the start.
+
+Usage:
+solver = TailingSolver.resume('sessions.ndjson', 'sessions.ckpt')
+for report in solver.follow(interval=5):
+    pprint(report)
+"""
+import os
+import time
+from log_reader import LogReader
+from stream_solver import StreamSolver
+
+
+class TailingSolver(StreamSolver):
+    CHECKPOINT_EVERY = 100000
+    CHECKPOINT_SECONDS = 30
+
+    @staticmethod
+    def resume(path, checkpoint_path, checkpoint_every=None, checkpoint_seconds=None):
+        if os.path.exists(checkpoint_path):
+            solver = StreamSolver.restore(checkpoint_path)
+            if os.path.abspath(solver.path) != os.path.abspath(path):
+                raise ValueError('{} is a checkpoint for {}, not {}'.format(
+                    checkpoint_path, solver.path, path))
+            solver.checkpoint_every = checkpoint_every or solver.checkpoint_every
+            solver.checkpoint_seconds = checkpoint_seconds or getattr(
+                solver, 'checkpoint_seconds', TailingSolver.CHECKPOINT_SECONDS)
+            solver.checkpointed_at = time.monotonic()
+            return solver
+        return TailingSolver(path, checkpoint_path, checkpoint_every, checkpoint_seconds)
+
+    def __init__(self, path, checkpoint_path=None, checkpoint_every=None,
+                 checkpoint_seconds=None):
+        super().__init__()
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every or self.CHECKPOINT_EVERY
+        self.checkpoint_seconds = checkpoint_seconds or self.CHECKPOINT_SECONDS
+        self.offset = 0
+        self.inode = None
+        self.since_checkpoint = 0
+        self.checkpointed_at = time.monotonic()
+
+    def poll(self):
+        """Consumes newly appended complete lines. Returns how many were read."""
+        added = 0
+
+        with open(self.path, 'rb') as f:
+            # Checkpoints from before inodes were tracked have none.
+            stat = os.fstat(f.fileno())
+            inode = getattr(self, 'inode', None)
+            if stat.st_size < self.offset or inode not in (None, stat.st_ino):
+                self.offset = 0
+            self.inode = stat.st_ino
+            f.seek(self.offset)
+            for line in f:
+                # A line without its newline is still being written.
+                if not line.endswith(b'\n'):
+                    break
+                self.offset += len(line)
+                log = LogReader.parse_line(line.decode('utf-8'))
+                if log:
+                    self.add(log)
+                    added += 1
+                    self.since_checkpoint += 1
+
+                if self.since_checkpoint >= self.checkpoint_every:
+                    self.save()
+
+        # A quiet log may never reach checkpoint_every, so time also triggers a save.
+        if self.since_checkpoint and \
+                time.monotonic() - self.checkpointed_at >= self.checkpoint_seconds:
+            self.save()
+
+        return added
+
+    def follow(self, interval=1.0):
+        """Polls forever, yielding a fresh report whenever new logs arrive. Saves
+        a checkpoint when stopped (the generator is closed or an exception such as
+        KeyboardInterrupt ends it).
+        """
+        try:
+            while True:
+                if self.poll():
+                    yield self.report()
+                else:
+                    time.sleep(interval)
+        finally:
+            if self.since_checkpoint:
+                self.save()
+
+    def save(self):
+        self.since_checkpoint = 0
+        self.checkpointed_at = time.monotonic()
+        if self.checkpoint_path:
+            self.checkpoint(self.checkpoint_path)
@@ -0,0 +1,85 @@
+"""
+Tests for TailingSolver following a log file as it grows.
+
+Usage:
+python -m unittest test_tailing_solver
+"""
+import os
+import tempfile
+import unittest
+from tailing_solver import TailingSolver
+
+
+class TailingSolverTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'sessions.ndjson')
+        self.checkpoint_path = os.path.join(tmp_dir.name, 'sessions.ckpt')
+        open(self.path, 'w').close()
+
+    def append(self, *logs):
+        with open(self.path, 'a') as f:
+            f.writelines(log + '\n' for log in logs)
+
+    def test_reports_from_an_empty_log_as_it_grows(self):
+        solver = TailingSolver.resume(self.path, self.checkpoint_path)
+        reports = solver.follow(interval=0)
+        report = solver.report()
+
+        self.assertEqual(report['basic']['sessions'], 0)
+        self.assertEqual(report['basic']['when'], (None, None))
+        self.assertIsNone(report['intermediate']['payment failed %'])
+        self.assertEqual(report['advanced']['user with most sessions'], (None, None))
+
+        self.append('1667197737689898746LHBP$B')
+        report = next(reports)
+        self.assertEqual(report['basic']['sessions'], 1)
+        self.assertEqual(report['intermediate']['payment failed %'], 0)
+        self.assertEqual(report['intermediate']['user failed %'], 0)
+        self.assertIsNone(report['advanced']['recoveries post-P*H'])
+
+        self.append('1667191186689898746LHBP*HP$B', '1667191190815959455LHBP*B')
+        report = next(reports)
+        self.assertEqual(report['basic']['sessions'], 3)
+        self.assertEqual(report['intermediate']['payment failed %'], 50)
+        self.assertEqual(report['advanced']['failure types'], {('P', 'H'): 1, ('P', 'B'): 1})
+        self.assertEqual(report['advanced']['recoveries post-P*H'], 100)
+        self.assertEqual(report['advanced']['recoveries post-P*B'], 0)
+
+        reports.close()
+        resumed = TailingSolver.resume(self.path, self.checkpoint_path)
+        self.assertEqual(resumed.session_count, 3)
+        self.assertEqual(resumed.poll(), 0)
+
+    def test_reads_a_truncated_log_from_the_start(self):
+        solver = TailingSolver(self.path)
+        self.append('1667197737689898746LHBP$B', '1667191186815959455LHBP$B')
+        self.assertEqual(solver.poll(), 2)
+
+        with open(self.path, 'w') as f:
+            f.write('1667191190815959455LHBP*B\n')
+        self.assertEqual(solver.poll(), 1)
+        self.assertEqual(solver.session_count, 3)
+
+    def test_reads_a_rotated_log_from_the_start(self):
+        solver = TailingSolver(self.path)
+        self.append('1667197737689898746LHBP$B')
+        self.assertEqual(solver.poll(), 1)
+
+        os.rename(self.path, self.path + '.1')
+        open(self.path, 'w').close()
+        self.append('1667191186815959455LHBP$B', '1667191190815959455LHBP*B')
+        self.assertEqual(solver.poll(), 2)
+        self.assertEqual(solver.session_count, 3)
+
+    def test_rejects_a_checkpoint_for_another_file(self):
+        solver = TailingSolver(self.path, self.checkpoint_path)
+        solver.save()
+
+        with self.assertRaises(ValueError):
+            TailingSolver.resume(self.path + '.1', self.checkpoint_path)
+
+
+if __name__ == '__main__':
+    unittest.main()